@@ -5,15 +5,30 @@ from datetime import datetime
 import pandas as pd
 import firebase_admin
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 from firebase_admin import credentials, firestore
 
 from dotenv import load_dotenv
 
-# Carregar variáveis de ambiente
+# Carregar variáveis de ambiente antes dos módulos locais, que leem
+# configurações (ex.: CATEGORY_LABELS_JSON) ao serem importados
 load_dotenv()
 
+import analytics_charts
+import analytics_export
+import analytics_stats
+import labels
+import analytics_table
+from analytics_aggregates import TOP_SIZE, AggregateStore, group_frame, summary_report
+from evaluation_store import DEFAULT_SNAPSHOT_PATH, EvaluationListener, EvaluationStore
+
+EVALUATIONS_COLLECTION = os.getenv("FIREBASE_DB_NAME", "evaluations")
+
+# Máximo de pontos individuais por violino (acima disso as notas são amostradas)
+ANALYTICS_MAX_POINTS = int(os.getenv("ANALYTICS_MAX_POINTS", analytics_charts.DEFAULT_MAX_POINTS))
+
+# Onde ficam os arquivos de exportação gerados (um por versão dos dados e formato)
+ANALYTICS_EXPORT_DIR = os.getenv("ANALYTICS_EXPORT_DIR", analytics_export.DEFAULT_EXPORT_DIR)
+
 # Configuração da página
 st.set_page_config(
     page_title="Mamãe Pingo - Painel de Análise",
@@ -70,18 +85,56 @@ def init_firebase():
         firebase_admin.initialize_app(cred)
     return firestore.client()
 
-# Carrega avaliações do Firebase
-@st.cache_data(ttl=60)  # Cache por 1 minuto
-def load_evaluations():
-    db = init_firebase()
-    evaluations = []
+# Cópia local das avaliações (SQLite), sincronizada incrementalmente
+@st.cache_resource
+def init_evaluation_store():
+    return EvaluationStore(os.getenv("EVALUATIONS_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH))
 
-    docs = db.collection("evaluations").stream()
-    for doc in docs:
-        data = doc.to_dict()
-        evaluations.append(data)
 
-    return pd.DataFrame(evaluations)
+def load_aggregates(aggregates, store):
+    """Recalcular os agregados a partir da cópia local inteira"""
+    version, frame = store.versioned_frame()
+    aggregates.load(frame, store.recent_by_score(TOP_SIZE), source_version=version)
+
+
+# Agregados em memória, atualizados em tempo real por um listener do Firestore (um por processo)
+@st.cache_resource
+def init_live_aggregates():
+    store = init_evaluation_store()
+    aggregates = AggregateStore()
+    load_aggregates(aggregates, store)
+    listener = EvaluationListener(init_firebase(), EVALUATIONS_COLLECTION, store, aggregates.apply)
+    return aggregates, listener
+
+
+# Fallback sem listener: busca só as avaliações novas ou alteradas desde a última sincronização
+@st.cache_data(ttl=60)  # No máximo uma sincronização por minuto
+def sync_evaluations():
+    store = init_evaluation_store()
+    aggregates, _ = init_live_aggregates()
+    aggregates.apply(store.sync(init_firebase(), EVALUATIONS_COLLECTION))
+    return store.version()
+
+
+# Tabelas por grupo e resumo derivados dos agregados (recalculados só quando a versão muda)
+@st.cache_data(max_entries=2)
+def aggregate_tables(version, _snapshot):
+    return {
+        "categories": group_frame(_snapshot, "categories"),
+        "files": group_frame(_snapshot, "files"),
+        "summary": summary_report(_snapshot),
+        # Intervalos de confiança (bootstrap sobre os histogramas; só os grupos alterados são reamostrados)
+        "categories_ci": analytics_stats.group_ci(_snapshot, "categories"),
+        "files_ci": analytics_stats.group_ci(_snapshot, "files"),
+    }
+
+
+# Ranking das vozes corrigido pelo viés de cada sessão (precisa de todas as notas; no máximo a cada 5 minutos)
+@st.cache_data(ttl=300, max_entries=1)
+def voice_ranking():
+    frame = init_evaluation_store().to_frame()
+    return analytics_stats.rank_voices(frame[["original_filename", "session_id", "score"]])
+
 
 # Cabeçalho
 st.markdown(
@@ -96,17 +149,29 @@ st.markdown(
 
 # Carrega dados
 try:
-    df = load_evaluations()
-
-    if not df.empty:
-        # Converter timestamp para datetime
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-
+    aggregates, listener = init_live_aggregates()
+    try:
+        listening = listener.ensure_running()
+    except Exception:
+        listening = False
+    if not listening:
+        sync_evaluations()
+
+    # A cópia local é compartilhada (CLI, outros processos do painel): se ela mudou
+    # por fora, os deltas deste processo não bastam e os agregados são recalculados
+    store = init_evaluation_store()
+    if aggregates.source_version != store.version():
+        load_aggregates(aggregates, store)
+
+    agg = aggregates.snapshot()
+    tables = aggregate_tables(agg["version"], agg)
+
+    if agg["overall"]["count"] > 0:
         # Linha de métricas
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            total_evals = len(df)
+            total_evals = agg["overall"]["count"]
             st.markdown(
                 f"""
                     <div class="metric-card">
@@ -118,7 +183,7 @@ try:
             )
 
         with col2:
-            avg_score = df["score"].mean()
+            avg_score = agg["overall"]["mean"]
             st.markdown(
                 f"""
                     <div class="metric-card">
@@ -130,7 +195,7 @@ try:
             )
 
         with col3:
-            unique_sessions = df["session_id"].nunique()
+            unique_sessions = agg["session_count"]
             st.markdown(
                 f"""
                     <div class="metric-card">
@@ -141,8 +206,6 @@ try:
                 unsafe_allow_html=True
             )
 
-        avg_per_session = total_evals / unique_sessions if unique_sessions > 0 else 0
-
         # with col4:
         #     avg_per_session = total_evals / unique_sessions if unique_sessions > 0 else 0
         #     st.markdown(
@@ -161,61 +224,20 @@ try:
 
         with col1:
             # Distribuição de notas
-            score_counts = df["score"].value_counts().sort_index()
-
-            # Criar labels personalizados
-            score_labels = {
-                1: "1 - Muito Inadequada",
-                2: "2 - Inadequada",
-                3: "3 - Razoável",
-                4: "4 - Boa",
-                5: "5 - Excelente"
-            }
-
-            fig_scores = px.bar(
-                x=[score_labels.get(x, str(x)) for x in score_counts.index],
-                y=score_counts.values,
-                title="Distribuição das Notas",
-                labels={'x': "Nota", 'y': "Quantidade"},
-                color=score_counts.index,
-                color_continuous_scale='RdYlGn'
-            )
-            fig_scores.update_traces(showlegend=False)
-            st.plotly_chart(fig_scores, use_container_width=True)
+            st.plotly_chart(analytics_charts.score_distribution(agg["score_counts"], labels.SCORE_LABELS), use_container_width=True)
 
         with col2:
             # Score médio por categoria
-            category_scores = df.groupby("category")["score"].agg(["mean", "count"])
+            category_scores = tables["categories"]
             if not category_scores.empty:
-                category_scores = category_scores.sort_values("mean", ascending=False)
-
                 # change names of the categories for the x axis
-                category_labels = {
-                    "with-enhancement-10": "Luciane - SE 10%",
-                    "with-enhancement-30": "Luciane - SE 30%",
-                    "no-enhancement": "Luciane",
-                    "synthesized": "Voz Sintética - v1",
-                    "new_synthesized": "Voz Sintética - v2",
-                    "library": "Biblioteca - ElevenLabs"
-                }
-                fig_category = px.bar(
-                    x=category_scores.index.map(category_labels),
-                    y=category_scores["mean"],
-                    title="Nota Média por Categoria",
-                    labels={'x': "Categoria", 'y': "Nota Média"},
-                    color=category_scores["mean"],
-                    color_continuous_scale="RdYlGn",
-                    text=category_scores["mean"].round(2)
-                )
-                fig_category.update_traces(texttemplate="%{text}", textposition="outside")
-                fig_category.update_layout(yaxis_range=[0, 5.5])
-                st.plotly_chart(fig_category, use_container_width=True)
+                category_labels = labels.category_labels(category_scores.index)
+                st.plotly_chart(analytics_charts.category_means(category_scores, category_labels), use_container_width=True)
 
         # Show a table with the mean "score" for "original_filename"
         st.markdown("### 📊 Média de Notas por Voz")
 
-        mean_scores = df.groupby("original_filename")["score"].mean().reset_index()
-        mean_scores["score"] = mean_scores["score"].round(2)
+        mean_scores = tables["files"]["mean"].round(2).reset_index()
 
         # change columns names for table
         mean_scores.columns = ["Voz", "Nota (Média)"]
@@ -228,50 +250,86 @@ try:
 
         # Show a vertical violin plot and scatter plot for every score of original_filename for the top 10 original_filename
         top_files = mean_scores.nlargest(5, "Nota (Média)")
-        scores_per_file = df[df["original_filename"].isin(top_files["Voz"])]
 
         # Show violin plot and scatter plot for each file, plot side by side
         for file in top_files["Voz"]:
-            file_scores = scores_per_file[scores_per_file["original_filename"] == file]["score"]
-            fig = px.violin(file_scores, y="score", box=True, points="all", title=f"Distribuição de Notas - {file}")
+            # As notas de cada arquivo são reconstruídas do histograma dos agregados (com amostragem acima do limite)
+            fig = analytics_charts.file_violin(file, agg["files"][file]["hist"], ANALYTICS_MAX_POINTS)
             st.plotly_chart(fig, use_container_width=True)
 
+        # Análise estatística: IC 95% por bootstrap e média ajustada pelo viés dos avaliadores
+        st.markdown("### 📐 Análise Estatística")
+
+        col1, col2 = st.columns([1, 2])
+
+        with col1:
+            st.markdown("#### Categorias (IC 95%)")
+            categories_ci = tables["categories_ci"].sort_values("mean", ascending=False)
+            st.dataframe(
+                pd.DataFrame({
+                    "Categoria": labels.relabel(categories_ci.index, labels.category_label),
+                    "Avaliações": categories_ci["count"].to_numpy(),
+                    "Nota (Média)": categories_ci["mean"].round(2).to_numpy(),
+                    "IC 95%": [f"{low:.2f} – {high:.2f}" for low, high in zip(categories_ci["ci_low"], categories_ci["ci_high"])],
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+
+        with col2:
+            st.markdown("#### Ranking das Vozes (ajustado por avaliador)")
+            ranking = voice_ranking().join(tables["files_ci"][["ci_low", "ci_high"]], how="left")
+            st.dataframe(
+                pd.DataFrame({
+                    "Posição": ranking["rank"].to_numpy(),
+                    "Voz": ranking.index,
+                    "Avaliações": ranking["count"].to_numpy(),
+                    "Nota (Média)": ranking["mean"].round(2).to_numpy(),
+                    "IC 95%": [f"{low:.2f} – {high:.2f}" for low, high in zip(ranking["ci_low"], ranking["ci_high"])],
+                    "Nota Ajustada": ranking["adjusted_mean"].round(2).to_numpy(),
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(
+                "A nota ajustada desconta o quanto cada sessão avalia acima ou abaixo da média "
+                "(modelo voz + avaliador). Atualizada a cada 5 minutos."
+            )
+
         # Tabela detalhada
         st.markdown("### 📋 Avaliações Recentes")
 
-        # Preparar dataframe para exibição
-        display_df = df[["anonymous_id", "score", "category", "duration", "timestamp", "session_id"]].copy()
-        display_df = display_df.sort_values("timestamp", ascending=False).head(100)
-
-        # Traduzir valores
-        score_labels = {
-            1: "1 ⭐ - Muito Inadequada",
-            2: "2 ⭐⭐ - Inadequada",
-            3: "3 ⭐⭐⭐ - Razoável",
-            4: "4 ⭐⭐⭐⭐ - Boa",
-            5: "5 ⭐⭐⭐⭐⭐ - Excelente"
-        }
-        display_df["score"] = display_df["score"].map(score_labels)
-        display_df["duration"] = display_df["duration"].map({"curto": "Curto", "longo": "Longo"})
-
-        # Renomear colunas
-        display_df.columns = ["ID Anônimo", "Nota", "Categoria", "Duração", "Data/Hora", "ID da Sessão"]
-
-        # Estilizar o dataframe
-        def style_score(val):
-            if "5 ⭐" in str(val):
-                return "color: #2e7d32; font-weight: bold;"
-            elif "4 ⭐" in str(val):
-                return "color: #558b2f; font-weight: bold;"
-            elif "3 ⭐" in str(val):
-                return "color: #f57c00; font-weight: bold;"
-            elif "2 ⭐" in str(val):
-                return "color: #e65100; font-weight: bold;"
-            elif "1 ⭐" in str(val):
-                return "color: #c62828; font-weight: bold;"
-            return ''
-
-        styled_df = display_df.style.applymap(style_score, subset=["Nota"])
+        # Filtros aplicados em SQL na cópia local; só a página exibida é lida
+        with st.expander("Filtros"):
+            filter_col1, filter_col2, filter_col3 = st.columns(3)
+            with filter_col1:
+                selected_categories = st.multiselect("Categorias", sorted(k for k in agg["categories"] if k))
+                selected_durations = st.multiselect("Durações", sorted(k for k in agg["durations"] if k))
+            with filter_col2:
+                min_score, max_score = st.slider("Notas", 1, 5, (1, 5))
+                session_filter = st.text_input("ID da Sessão").strip()
+            with filter_col3:
+                date_range = st.date_input("Período", value=())
+
+        start_date = date_range[0] if len(date_range) > 0 else None
+        end_date = date_range[1] if len(date_range) > 1 else start_date
+        page = st.number_input("Página", min_value=1, value=1, step=1)
+
+        page_df, filtered_total, total_pages = analytics_table.query_page(
+            init_evaluation_store(),
+            page=int(page),
+            categories=selected_categories,
+            durations=selected_durations,
+            session_id=session_filter,
+            min_score=min_score,
+            max_score=max_score,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        st.caption(f"Página {min(int(page), total_pages)} de {total_pages} ({filtered_total} avaliações)")
+
+        # Traduzir valores (rótulos de labels.py) e estilizar
+        styled_df = analytics_table.format_page(page_df)
         st.dataframe(styled_df, use_container_width=True, hide_index=True)
 
         # Análise adicional
@@ -280,25 +338,10 @@ try:
         col1, col2 = st.columns(2)
 
         with col1:
-            # Top 10 maiores arquivos
-            top_files = df.nlargest(10, 'score')[['anonymous_id', 'score', 'category']]
+            # Top 10 maiores avaliações (mais recentes entre as maiores notas)
             st.markdown("#### 🏆 Top 10 Maiores Avaliações")
-            for _, row in top_files.iterrows():
-                category = row["category"]
-
-                if category == "with-enhancement-10":
-                    category = "Luciane - SE 10%"
-                elif category == "with-enhancement-30":
-                    category = "Luciane - SE 30%"
-                elif category == "no-enhancement":
-                    category = "Luciane"
-                elif category == "synthesized":
-                    category = "Voz Sintética - v1"
-                elif category == "new_synthesized":
-                    category = "Voz Sintética - v2"
-                elif category == "library":
-                    category = "Biblioteca - ElevenLabs"
-
+            for row in agg["top"]:
+                category = labels.category_label(row["category"])
                 st.write(f"• {row['anonymous_id']} - Nota {row['score']:.1f} (**{category}**)")
 
         # with col2:
@@ -318,33 +361,31 @@ try:
         col1, col2 = st.columns(2)
 
         with col1:
-            csv = df.to_csv(index=False)
-            st.download_button(
-                label="Baixar Dataset Completo (CSV)",
-                data=csv,
-                file_name=f"mamae_pingo_avaliacoes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
-            )
+            # O arquivo só é gerado (em lotes, no disco) quando alguém pede, e é reaproveitado na mesma versão
+            export_formats = {"CSV": "csv", "CSV compactado (.gz)": "csv.gz", "Parquet": "parquet"}
+            export_format = export_formats[st.selectbox("Formato", list(export_formats))]
+            if st.button("Preparar Dataset Completo"):
+                with st.spinner("Gerando arquivo..."):
+                    st.session_state.export_path = analytics_export.export(
+                        init_evaluation_store(), export_format, ANALYTICS_EXPORT_DIR
+                    )
+
+            # Uma vez só: o st.download_button lê o arquivo inteiro para a memória a cada
+            # execução da página, então o botão some na próxima interação
+            export_path = st.session_state.pop("export_path", None)
+            if export_path and export_path.endswith(analytics_export.FORMATS[export_format][0]) and os.path.exists(export_path):
+                extension, mime = analytics_export.FORMATS[export_format]
+                with open(export_path, "rb") as export_file:
+                    st.download_button(
+                        label=f"Baixar Dataset Completo ({extension.upper()})",
+                        data=export_file,
+                        file_name=f"mamae_pingo_avaliacoes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                        mime=mime
+                    )
 
         with col2:
             # Relatório resumido
-            summary = {
-                'Total de Avaliações': total_evals,
-                'Nota Média Geral': f"{avg_score:.2f}",
-                'Nota Mais Frequente': df['score'].mode()[0] if not df['score'].mode().empty else 'N/A',
-                'Desvio Padrão': f"{df['score'].std():.2f}",
-                'Sessões Únicas': unique_sessions,
-                'Média por Sessão': f"{avg_per_session:.1f}",
-                'Período': f"{df['timestamp'].min().strftime('%d/%m/%Y')} a {df['timestamp'].max().strftime('%d/%m/%Y')}"
-            }
-
-            # Adicionar distribuição de notas
-            score_dist = df['score'].value_counts().sort_index()
-            for score in range(1, 6):
-                count = score_dist.get(score, 0)
-                percentage = (count / total_evals * 100) if total_evals > 0 else 0
-                summary[f'Nota {score}'] = f"{count} ({percentage:.1f}%)"
-
+            summary = tables["summary"]
             summary_text = '\n'.join([f"{k}: {v}" for k, v in summary.items()])
             st.download_button(
                 label="Baixar Relatório Resumido (TXT)",
@@ -362,5 +403,6 @@ except Exception as e:
 
 # Botão de atualização
 if st.button("🔄 Atualizar Dados"):
-    st.cache_data.clear()
+    # Os agregados já chegam em tempo real; sem listener, força uma nova sincronização
+    sync_evaluations.clear()
     st.rerun()
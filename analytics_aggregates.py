@@ -0,0 +1,262 @@
+"""
+Agregados das avaliações mantidos incrementalmente para o painel
+
+Cada avaliação que chega (ou é alterada/removida) aplica apenas um delta nos
+contadores por nota, categoria, arquivo (`original_filename`), duração e
+sessão. Os gráficos leem esses agregados prontos, sem reagrupar o DataFrame,
+então o custo de renderizar não cresce com o número de votos.
+
+Na partida, os agregados são montados de uma vez a partir do DataFrame tipado
+(`build_aggregates`): um único `bincount` por agrupamento sobre os códigos das
+categóricas dá o histograma de notas de todos os grupos, e contagem, soma e
+soma dos quadrados saem do histograma.
+"""
+
+import math
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+SCORES = (1, 2, 3, 4, 5)
+TOP_SIZE = 10
+
+GROUPS = {
+    "categories": "category",
+    "files": "original_filename",
+    "durations": "duration",
+    "sessions": "session_id",
+}
+
+
+class GroupStats:
+    """Contagem, soma, soma dos quadrados e histograma das notas de um grupo"""
+
+    __slots__ = ("count", "total", "total_sq", "hist")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.hist = [0] * len(SCORES)
+
+    def add(self, score, sign=1):
+        self.count += sign
+        self.total += sign * score
+        self.total_sq += sign * score * score
+        if score in SCORES:
+            self.hist[SCORES.index(score)] += sign
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else float("nan")
+
+    @property
+    def std(self):
+        """Desvio padrão amostral (como o pandas)"""
+        if self.count < 2:
+            return float("nan")
+        variance = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(max(0.0, variance))
+
+    def summary(self):
+        return {"count": self.count, "mean": self.mean, "std": self.std, "hist": list(self.hist)}
+
+    @classmethod
+    def from_hist(cls, hist):
+        stats = cls()
+        stats.hist = [int(n) for n in hist]
+        stats.count = sum(stats.hist)
+        stats.total = float(sum(n * score for n, score in zip(stats.hist, SCORES)))
+        stats.total_sq = float(sum(n * score * score for n, score in zip(stats.hist, SCORES)))
+        return stats
+
+
+def _score_hist(keys, score_index):
+    """Histograma de notas por grupo em um único bincount: (chaves, matriz grupos x notas)"""
+    categorical = pd.Categorical(keys)
+    codes = categorical.codes.astype(np.int64)
+    keys = list(categorical.categories)
+    if (codes < 0).any():
+        # Valores ausentes viram o grupo None, como nos deltas
+        codes = np.where(codes < 0, len(keys), codes)
+        keys.append(None)
+    size = len(SCORES)
+    hist = np.bincount(codes * size + score_index, minlength=len(keys) * size)
+    return keys, hist.reshape(len(keys), size)
+
+
+def build_aggregates(frame):
+    """Agregados de um DataFrame de avaliações em uma passada vetorizada
+
+    Retorna `GroupStats` geral e por grupo (chaves de GROUPS) e o primeiro e o
+    último timestamp (segundos UTC). Notas fora de SCORES são ignoradas.
+    """
+    score = pd.to_numeric(frame["score"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    valid = np.isin(score, SCORES)
+    score_index = np.searchsorted(SCORES, score[valid]).astype(np.int64)
+
+    result = {"overall": GroupStats.from_hist(np.bincount(score_index, minlength=len(SCORES)))}
+    for name, column in GROUPS.items():
+        keys, hist = _score_hist(frame[column][valid], score_index)
+        result[name] = {key: GroupStats.from_hist(row) for key, row in zip(keys, hist) if row.any()}
+
+    timestamps = frame["timestamp"][valid].dropna()
+    result["first_timestamp"] = timestamps.min().timestamp() if len(timestamps) else None
+    result["last_timestamp"] = timestamps.max().timestamp() if len(timestamps) else None
+    return result
+
+
+class AggregateStore:
+    """Agregados das avaliações atualizados por deltas (seguro entre threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        # Versão da cópia local (EvaluationStore) refletida nos agregados; None se desatualizados
+        self.source_version = None
+        self._reset()
+
+    def _reset(self):
+        self._overall = GroupStats()
+        self._groups = {name: {} for name in GROUPS}
+        self._first = None
+        self._last = None
+        # Votos mais recentes por nota, para a lista "Top 10" (doc_id, anonymous_id, category)
+        self._recent = {score: deque(maxlen=TOP_SIZE) for score in SCORES}
+
+    def _add(self, doc_id, row, sign):
+        score = row.get("score")
+        if score is None:
+            return
+        self._overall.add(score, sign)
+        for name, column in GROUPS.items():
+            key = row.get(column)
+            stats = self._groups[name].get(key)
+            if stats is None:
+                stats = self._groups[name][key] = GroupStats()
+            stats.add(score, sign)
+            if stats.count == 0:
+                del self._groups[name][key]
+
+        recent = self._recent.get(score)
+        if recent is not None:
+            if sign > 0:
+                recent.append((doc_id, row.get("anonymous_id"), row.get("category")))
+            else:
+                for item in list(recent):
+                    if item[0] == doc_id:
+                        recent.remove(item)
+
+        timestamp = row.get("timestamp")
+        if sign > 0 and timestamp is not None:
+            self._first = timestamp if self._first is None else min(self._first, timestamp)
+            self._last = timestamp if self._last is None else max(self._last, timestamp)
+
+    def apply(self, changes):
+        """Aplicar mudanças [(doc_id, linha antiga ou None, linha nova ou None)]
+
+        Com as versões da cópia local (evaluation_store.Changes), mudanças já
+        contidas nos agregados são ignoradas; se faltar alguma versão no meio
+        (escrita de outro processo), os agregados ficam marcados como
+        desatualizados e devem ser recarregados.
+        """
+        if not changes:
+            return
+        before, after = getattr(changes, "before", None), getattr(changes, "after", None)
+        with self._lock:
+            if after is not None and self.source_version is not None:
+                if after <= self.source_version:
+                    return
+                if before != self.source_version:
+                    self.source_version = None
+                    return
+                self.source_version = after
+            for doc_id, old, new in changes:
+                if old is not None:
+                    self._add(doc_id, old, -1)
+                if new is not None:
+                    self._add(doc_id, new, 1)
+            self.version += 1
+
+    def load(self, frame, recent=None, source_version=None):
+        """Recalcular tudo a partir do DataFrame das avaliações
+
+        `recent` são os votos mais recentes por nota, {nota: [(doc_id,
+        anonymous_id, category), ...]} do mais antigo para o mais novo.
+        `source_version` é a versão da cópia local de onde veio `frame`.
+        """
+        aggregates = build_aggregates(frame)
+        with self._lock:
+            self._reset()
+            self._overall = aggregates["overall"]
+            self._groups = {name: aggregates[name] for name in GROUPS}
+            self._first = aggregates["first_timestamp"]
+            self._last = aggregates["last_timestamp"]
+            for score, items in (recent or {}).items():
+                if score in self._recent:
+                    self._recent[score].extend(items)
+            self.source_version = source_version
+            self.version += 1
+
+    def snapshot(self):
+        """Cópia consistente dos agregados para os gráficos"""
+        with self._lock:
+            top = []
+            for score in reversed(SCORES):
+                for _, anonymous_id, category in reversed(self._recent[score]):
+                    if len(top) < TOP_SIZE:
+                        top.append({"anonymous_id": anonymous_id, "score": score, "category": category})
+            return {
+                "version": self.version,
+                "overall": self._overall.summary(),
+                "score_counts": dict(zip(SCORES, self._overall.hist)),
+                # Sessões só são contadas: copiar todas a cada execução da página é caro
+                **{name: {key: stats.summary() for key, stats in groups.items()}
+                   for name, groups in self._groups.items() if name != "sessions"},
+                "session_count": len(self._groups["sessions"]),
+                "first_timestamp": self._first,
+                "last_timestamp": self._last,
+                "top": top,
+            }
+
+
+def group_frame(snapshot, name):
+    """Contagem, média e desvio por grupo do snapshot como DataFrame (índice = chave)"""
+    groups = snapshot[name]
+    return pd.DataFrame(
+        [(stats["count"], stats["mean"], stats["std"]) for stats in groups.values()],
+        index=pd.Index(list(groups), name=GROUPS[name]),
+        columns=["count", "mean", "std"],
+    )
+
+
+def summary_report(snapshot):
+    """Resumo geral das avaliações (relatório TXT do painel)"""
+    overall = snapshot["overall"]
+    total = overall["count"]
+    sessions = snapshot["session_count"]
+    score_counts = snapshot["score_counts"]
+    first = snapshot["first_timestamp"]
+    last = snapshot["last_timestamp"]
+    first_day = datetime.fromtimestamp(first, tz=timezone.utc) if first else None
+    last_day = datetime.fromtimestamp(last, tz=timezone.utc) if last else None
+
+    summary = {
+        'Total de Avaliações': total,
+        'Nota Média Geral': f"{overall['mean']:.2f}",
+        'Nota Mais Frequente': max(score_counts, key=score_counts.get) if total > 0 else 'N/A',
+        'Desvio Padrão': f"{overall['std']:.2f}",
+        'Sessões Únicas': sessions,
+        'Média por Sessão': f"{total / sessions if sessions else 0:.1f}",
+        'Período': f"{first_day.strftime('%d/%m/%Y')} a {last_day.strftime('%d/%m/%Y')}" if first_day else 'N/A'
+    }
+
+    # Adicionar distribuição de notas
+    for score in SCORES:
+        count = score_counts.get(score, 0)
+        percentage = (count / total * 100) if total > 0 else 0
+        summary[f'Nota {score}'] = f"{count} ({percentage:.1f}%)"
+    return summary
@@ -0,0 +1,162 @@
+"""
+Gráficos do painel de análise, memorizados pelo conteúdo dos agregados
+
+Cada figura é identificada por um hash (SHA-256) dos dados que ela mostra e
+guardada em um cache LRU do processo, compartilhado por todas as sessões.
+Enquanto os números de um gráfico não mudam, as reexecuções reaproveitam a
+mesma figura (e o Streamlit envia o mesmo JSON, que o navegador já tem em
+cache) em vez de montá-la de novo com o plotly express.
+
+Os violinos com `points="all"` recebem no máximo `max_points` pontos: acima
+disso o histograma de notas é reduzido proporcionalmente, mantendo a forma da
+distribuição e limitando o tamanho do payload.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from analytics_aggregates import SCORES
+
+DEFAULT_MAX_POINTS = 2000
+DEFAULT_CACHE_SIZE = 128
+
+
+def _string_keys(value):
+    """Chaves como texto (None, números e textos misturados não se ordenam)"""
+    if isinstance(value, dict):
+        return {str(key): _string_keys(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_string_keys(item) for item in value]
+    return value
+
+
+def content_hash(*parts):
+    """Hash estável dos dados de um gráfico"""
+    payload = json.dumps(_string_keys(parts), sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FigureCache:
+    """Cache LRU de figuras por (tipo, hash do conteúdo), seguro entre threads"""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._figures = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return figure
+
+        # Montar fora do lock; se duas sessões montarem ao mesmo tempo, fica a primeira
+        figure = build()
+        with self._lock:
+            self.misses += 1
+            figure = self._figures.setdefault(key, figure)
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._figures), "hits": self.hits, "misses": self.misses}
+
+
+_cache = FigureCache()
+
+
+def downsample_hist(hist, max_points):
+    """Reduzir um histograma para no máximo `max_points` pontos, proporcionalmente
+
+    Cada nota presente mantém ao menos um ponto (a extensão do violino não
+    muda) e o restante é dividido pelo método dos maiores restos.
+    """
+    hist = np.asarray(hist, dtype=np.int64)
+    total = int(hist.sum())
+    if max_points is None or total <= max_points:
+        return hist
+    present = hist > 0
+    reduced = present.astype(np.int64)
+    budget = max_points - int(reduced.sum())
+    if budget > 0:
+        exact = hist * (budget / total)
+        extra = np.floor(exact).astype(np.int64)
+        remaining = budget - int(extra.sum())
+        extra[np.argsort(-(exact - extra), kind="stable")[:remaining]] += 1
+        reduced += extra
+    return np.minimum(reduced, hist)
+
+
+def score_distribution(score_counts, score_labels):
+    """Barras com a quantidade de avaliações por nota"""
+    counts = {score: count for score, count in score_counts.items() if count > 0}
+
+    def build():
+        series = pd.Series(counts)
+        figure = px.bar(
+            x=[score_labels.get(x, str(x)) for x in series.index],
+            y=series.values,
+            title="Distribuição das Notas",
+            labels={'x': "Nota", 'y': "Quantidade"},
+            color=series.index,
+            color_continuous_scale='RdYlGn'
+        )
+        figure.update_traces(showlegend=False)
+        return figure
+
+    return _cache.get_or_build(("scores", content_hash(counts, score_labels)), build)
+
+
+def category_means(category_scores, category_labels):
+    """Barras com a nota média por categoria (`category_scores` tem a coluna "mean")"""
+    means = category_scores["mean"].sort_values(ascending=False)
+    data = list(zip(means.index, means.round(6)))
+
+    def build():
+        figure = px.bar(
+            x=means.index.map(category_labels),
+            y=means,
+            title="Nota Média por Categoria",
+            labels={'x': "Categoria", 'y': "Nota Média"},
+            color=means,
+            color_continuous_scale="RdYlGn",
+            text=means.round(2)
+        )
+        figure.update_traces(texttemplate="%{text}", textposition="outside")
+        figure.update_layout(yaxis_range=[0, 5.5])
+        return figure
+
+    return _cache.get_or_build(("categories", content_hash(data, category_labels)), build)
+
+
+def file_violin(file, hist, max_points=DEFAULT_MAX_POINTS):
+    """Violino com as notas de um arquivo, reconstruídas do histograma"""
+    hist = [int(n) for n in hist]
+    points = downsample_hist(hist, max_points)
+
+    def build():
+        title = f"Distribuição de Notas - {file}"
+        if int(points.sum()) < sum(hist):
+            title += f" (amostra de {int(points.sum())} de {sum(hist)} notas)"
+        file_scores = pd.DataFrame({"score": np.repeat(SCORES, points)})
+        return px.violin(file_scores, y="score", box=True, points="all", title=title)
+
+    return _cache.get_or_build(("violin", content_hash(file, hist, max_points)), build)
+
+
+def cache_stats():
+    """Entradas, acertos e falhas do cache de figuras"""
+    return _cache.stats()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Exportação completa das avaliações (CSV, CSV compactado ou Parquet)
+
+O arquivo só é gerado quando alguém pede, lendo a cópia local (SQLite) em
+lotes de `chunk_rows` linhas e escrevendo cada lote direto no disco, então a
+memória usada não cresce com o número de avaliações. A leitura acontece em
+uma única transação, para que o conteúdo corresponda exatamente à versão dos
+dados no nome do arquivo. Arquivos já gerados para a versão atual são
+reaproveitados; os de versões anteriores são apagados.
+
+Uso: python analytics_export.py [csv|csv.gz|parquet] [diretório]
+"""
+
+import os
+import sys
+import gzip
+import tempfile
+import threading
+
+from analytics_frame import COLUMNS, iter_frames
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - o Streamlit depende do pyarrow
+    pa = None
+
+DEFAULT_EXPORT_DIR = os.path.join("data", "exports")
+CHUNK_ROWS = 50_000
+
+# formato -> (extensão, tipo MIME)
+FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "csv.gz": ("csv.gz", "application/gzip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+_lock = threading.Lock()
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("anonymous_id", pa.string()),
+        ("original_filename", pa.string()),
+        ("score", pa.int8()),
+        ("category", pa.string()),
+        ("duration", pa.string()),
+        ("session_id", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("user_agent", pa.string()),
+    ])
+
+
+def _write_csv(frames, handle):
+    header = True
+    for frame in frames:
+        frame.to_csv(handle, header=header, index=False)
+        header = False
+    if header:
+        handle.write(",".join(COLUMNS) + "\n")
+
+
+def _write(frames, path, fmt):
+    if fmt == "parquet":
+        schema = _parquet_schema()
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for frame in frames:
+                # Categóricas viram texto; o Parquet já codifica por dicionário
+                writer.write_table(pa.Table.from_pandas(frame, preserve_index=False).cast(schema))
+    elif fmt == "csv.gz":
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as handle:
+            _write_csv(frames, handle)
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            _write_csv(frames, handle)
+
+
+def export_path(directory, version, fmt):
+    return os.path.join(directory, f"mamae_pingo_avaliacoes_v{version}.{FORMATS[fmt][0]}")
+
+
+def _prune(directory, fmt, keep):
+    suffix = "." + FORMATS[fmt][0]
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith("mamae_pingo_avaliacoes_v") and name.endswith(suffix) and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def export(store, fmt="csv", directory=DEFAULT_EXPORT_DIR, chunk_rows=CHUNK_ROWS):
+    """Caminho do arquivo de exportação da versão atual, gerando-o se preciso"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError("Exportação em Parquet requer o pyarrow")
+    os.makedirs(directory, exist_ok=True)
+
+    with _lock, store.read_snapshot() as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        version = int(row[0]) if row and row[0] else 0
+        path = export_path(directory, version, fmt)
+        if os.path.exists(path):
+            return path
+
+        frames = iter_frames(conn, f"SELECT {', '.join(COLUMNS)} FROM evaluations ORDER BY timestamp", (), chunk_rows)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".export-")
+        os.close(fd)
+        try:
+            _write(frames, tmp_path, fmt)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    _prune(directory, fmt, path)
+    return path
+
+
+if __name__ == "__main__":
+    from evaluation_store import DEFAULT_SNAPSHOT_PATH, EvaluationStore
+
+    fmt = sys.argv[1] if len(sys.argv) > 1 else "csv.gz"
+    directory = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_EXPORT_DIR
+    store = EvaluationStore(os.getenv("EVALUATIONS_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH))
+    path = export(store, fmt, directory)
+    print(f"✅ {store.count()} avaliações exportadas para {path} ({os.path.getsize(path) / 2 ** 20:.1f} MiB)")
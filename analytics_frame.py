@@ -0,0 +1,126 @@
+"""
+DataFrame tipado das avaliações para o painel de análise
+
+As colunas de texto repetitivas (IDs, arquivo, categoria, duração, sessão,
+navegador) viram categóricas (codificação por dicionário), a nota vira int8 e
+o timestamp vira datetime64 em UTC. Com isso o frame ocupa uma fração da
+memória das colunas `object` e os `groupby`/`isin` trabalham sobre códigos
+inteiros em vez de comparar strings.
+
+Quando o pyarrow está disponível (ele já vem com o Streamlit) as colunas são
+montadas direto em Arrow e convertidas de uma vez; sem ele, o mesmo esquema é
+aplicado com pandas.
+"""
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - o Streamlit depende do pyarrow
+    pa = None
+
+CATEGORICAL_COLUMNS = (
+    "anonymous_id",
+    "original_filename",
+    "category",
+    "duration",
+    "session_id",
+    "user_agent",
+)
+
+COLUMNS = [
+    "anonymous_id",
+    "original_filename",
+    "score",
+    "category",
+    "duration",
+    "session_id",
+    "timestamp",
+    "user_agent",
+]
+
+# Linhas lidas do SQLite por lote na montagem em Arrow
+CHUNK_ROWS = 100_000
+
+
+def typed_frame(df):
+    """Aplicar o esquema (categóricas, nota int8, timestamp UTC) a um DataFrame"""
+    df = df.copy()
+    for column in COLUMNS:
+        if column not in df:
+            df[column] = None
+    df = df[COLUMNS]
+
+    for column in CATEGORICAL_COLUMNS:
+        if not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+
+    score = pd.to_numeric(df["score"], errors="coerce")
+    df["score"] = score.astype("Int8" if score.isna().any() else "int8")
+
+    timestamp = df["timestamp"]
+    if pd.api.types.is_numeric_dtype(timestamp):
+        # Cópia local guarda segundos desde a época (UTC)
+        df["timestamp"] = pd.to_datetime(timestamp, unit="s", utc=True)
+    elif not isinstance(timestamp.dtype, pd.DatetimeTZDtype):
+        df["timestamp"] = pd.to_datetime(timestamp, utc=True)
+    return df
+
+
+def _arrow_column(column, values):
+    if column in CATEGORICAL_COLUMNS:
+        return pa.array(values, type=pa.string()).dictionary_encode()
+    if column == "score":
+        return pa.array(values, type=pa.int8())
+    # timestamp em segundos (REAL) -> microssegundos -> timestamp UTC
+    seconds = pa.array(values, type=pa.float64())
+    micros = pc.cast(pc.round(pc.multiply(seconds, 1_000_000)), pa.int64())
+    return micros.cast(pa.timestamp("us", tz="UTC"))
+
+
+def _arrow_table(chunks):
+    batches = []
+    for rows in chunks:
+        columns = list(zip(*rows)) if rows else [[] for _ in COLUMNS]
+        arrays = [_arrow_column(column, list(values)) for column, values in zip(COLUMNS, columns)]
+        batches.append(pa.RecordBatch.from_arrays(arrays, names=COLUMNS))
+    if not batches:
+        return None
+    # Os dicionários de cada lote são unificados na conversão para pandas
+    return pa.Table.from_batches(batches)
+
+
+def _fetch_chunks(conn, sql, params, chunk_rows):
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield rows
+
+
+def read_frame(conn, sql, params=()):
+    """Executar `sql` (que seleciona COLUMNS, nessa ordem) e retornar o frame tipado"""
+    if pa is None:
+        return typed_frame(pd.read_sql_query(sql, conn, params=params))
+
+    table = _arrow_table(_fetch_chunks(conn, sql, params, CHUNK_ROWS))
+    if table is None:
+        return typed_frame(pd.DataFrame(columns=COLUMNS))
+    return typed_frame(table.to_pandas())
+
+
+def iter_frames(conn, sql, params=(), chunk_rows=CHUNK_ROWS):
+    """Como read_frame, mas gera um frame tipado por lote de `chunk_rows` linhas"""
+    for rows in _fetch_chunks(conn, sql, params, chunk_rows):
+        if pa is None:
+            yield typed_frame(pd.DataFrame.from_records(rows, columns=COLUMNS))
+        else:
+            yield typed_frame(_arrow_table([rows]).to_pandas())
+
+
+def frame_from_records(records):
+    """Frame tipado a partir de dicionários (ex.: documentos do Firestore)"""
+    df = pd.DataFrame.from_records(list(records), columns=COLUMNS)
+    return typed_frame(df)
@@ -0,0 +1,205 @@
+"""
+Análise estatística das avaliações para o painel
+
+- Intervalos de confiança por bootstrap: como as notas são discretas (1 a 5),
+  reamostrar as notas de um grupo equivale a sortear uma multinomial sobre o
+  seu histograma. Todos os grupos e réplicas são sorteados de uma vez com
+  NumPy, sem percorrer as avaliações. O IC de cada grupo fica guardado
+  junto com o histograma que o gerou, e só os grupos cujo histograma mudou
+  são reamostrados a cada nova versão dos agregados.
+- Normalização por sessão: z-score de cada nota em relação à média e ao
+  desvio das notas da própria sessão, para comparar avaliadores mais severos
+  e mais generosos na mesma escala.
+- Ranking das vozes: modelo aditivo nota = média + efeito da voz + efeito do
+  avaliador (sessão) + ruído, com os efeitos encolhidos em direção a zero
+  (equivalente ao BLUP de um modelo de efeitos aleatórios com razões de
+  variância fixas). É ajustado por mínimos quadrados alternados, cada passo
+  um `bincount` sobre os códigos das categóricas.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analytics_aggregates import SCORES
+
+DEFAULT_BOOTSTRAP = 2000
+
+
+def bootstrap_ci(hists, n_boot=DEFAULT_BOOTSTRAP, confidence=0.95, seed=0):
+    """Média e IC por bootstrap para cada linha de `hists` (grupos x notas)
+
+    Retorna um array (grupos x 3) com média, limite inferior e superior.
+    Grupos sem notas ficam com NaN.
+    """
+    hists = np.asarray(hists, dtype=np.int64).reshape(-1, len(SCORES))
+    counts = hists.sum(axis=1)
+    values = np.asarray(SCORES, dtype=float)
+    result = np.full((len(hists), 3), np.nan)
+    valid = counts > 0
+    if not valid.any():
+        return result
+
+    counts, hists = counts[valid], hists[valid]
+    probabilities = hists / counts[:, None]
+    rng = np.random.default_rng(seed)
+    # (grupos x réplicas x notas): cada réplica reamostra n notas do histograma do grupo
+    draws = rng.multinomial(counts[:, None], probabilities[:, None, :], size=(len(counts), n_boot))
+    means = draws @ values / counts[:, None]
+
+    tail = (1 - confidence) / 2 * 100
+    result[valid, 0] = probabilities @ values
+    result[valid, 1], result[valid, 2] = np.percentile(means, [tail, 100 - tail], axis=1)
+    return result
+
+
+class GroupCICache:
+    """ICs por grupo, válidos enquanto o histograma do grupo não muda (seguro entre threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {}
+        self.hits = 0
+        self.misses = 0
+
+    def compute(self, name, groups, n_boot, confidence, seed):
+        """Array (grupos x 3) na ordem de `groups`, reamostrando só os grupos alterados"""
+        slot = (name, n_boot, confidence, seed)
+        keys = list(groups)
+        hists = [tuple(groups[key]["hist"]) for key in keys]
+        with self._lock:
+            entries = self._groups.get(slot, {})
+            rows = [entries[key][1] if entries.get(key, (None,))[0] == hist else None
+                    for key, hist in zip(keys, hists)]
+        stale = [i for i, row in enumerate(rows) if row is None]
+
+        # Reamostrar fora do lock, só os grupos novos ou com notas novas
+        if stale:
+            fresh = bootstrap_ci([hists[i] for i in stale], n_boot, confidence, seed)
+            for i, row in zip(stale, fresh):
+                rows[i] = row
+        with self._lock:
+            self.hits += len(keys) - len(stale)
+            self.misses += len(stale)
+            # Grupos que sumiram dos agregados são descartados
+            self._groups[slot] = {key: (hist, row) for key, hist, row in zip(keys, hists, rows)}
+        return np.array(rows).reshape(-1, 3)
+
+    def stats(self):
+        with self._lock:
+            return {"groups": sum(map(len, self._groups.values())), "hits": self.hits, "misses": self.misses}
+
+
+_ci_cache = GroupCICache()
+
+
+def group_ci(snapshot, name, n_boot=DEFAULT_BOOTSTRAP, confidence=0.95, seed=0):
+    """IC por bootstrap para cada grupo dos agregados (ex.: "files", "categories")"""
+    groups = snapshot[name]
+    keys = list(groups)
+    ci = _ci_cache.compute(name, groups, n_boot, confidence, seed) if keys else np.empty((0, 3))
+    return pd.DataFrame({
+        "count": [groups[key]["count"] for key in keys],
+        "mean": ci[:, 0],
+        "ci_low": ci[:, 1],
+        "ci_high": ci[:, 2],
+    }, index=pd.Index(keys, name=name))
+
+
+def _scores(frame):
+    return pd.to_numeric(frame["score"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _codes(column):
+    categorical = pd.Categorical(column)
+    return categorical.codes.astype(np.int64), categorical.categories
+
+
+def session_zscores(frame, session="session_id"):
+    """Z-score de cada nota dentro da sua sessão (0 quando a sessão não varia, NaN sem nota)"""
+    scores = _scores(frame)
+    codes, categories = _codes(frame[session])
+    n_groups = len(categories) + 1
+    codes = np.where(codes < 0, len(categories), codes)
+    valid = ~np.isnan(scores)
+    values = np.where(valid, scores, 0.0)
+
+    counts = np.bincount(codes, weights=valid, minlength=n_groups)
+    sums = np.bincount(codes, weights=values, minlength=n_groups)
+    means = sums / np.maximum(counts, 1)
+    deviations = np.where(valid, values - means[codes], 0.0)
+    variances = np.bincount(codes, weights=deviations ** 2, minlength=n_groups) / np.maximum(counts - 1, 1)
+    stds = np.sqrt(variances)[codes]
+    z = np.divide(deviations, stds, out=np.zeros_like(deviations), where=stds > 0)
+    z[~valid] = np.nan
+    return pd.Series(z, index=frame.index, name="z_score")
+
+
+def normalized_means(frame, group="original_filename", session="session_id"):
+    """Média dos z-scores por sessão para cada grupo"""
+    z = session_zscores(frame, session)
+    codes, categories = _codes(frame[group])
+    keep = (codes >= 0) & z.notna().to_numpy()
+    counts = np.bincount(codes[keep], minlength=len(categories))
+    sums = np.bincount(codes[keep], weights=z.to_numpy()[keep], minlength=len(categories))
+    present = counts > 0
+    return pd.DataFrame(
+        {"count": counts[present], "mean_z": sums[present] / counts[present]},
+        index=pd.Index(categories[present], name=group),
+    )
+
+
+def rank_voices(frame, voice="original_filename", rater="session_id",
+                voice_shrinkage=2.0, rater_shrinkage=5.0, iterations=50, tolerance=1e-6):
+    """Ranking das vozes pelo modelo aditivo voz + avaliador
+
+    `voice_shrinkage` e `rater_shrinkage` são as razões entre a variância do
+    ruído e a dos efeitos (quantas notas "a zero" cada efeito recebe de
+    prior). Retorna, por voz: número de notas, média bruta, efeito da voz,
+    média ajustada (sem o viés dos avaliadores), erro padrão aproximado e a
+    posição no ranking.
+    """
+    scores = _scores(frame)
+    voice_codes, voices = _codes(frame[voice])
+    rater_codes, raters = _codes(frame[rater])
+    keep = (voice_codes >= 0) & ~np.isnan(scores)
+    scores, voice_codes = scores[keep], voice_codes[keep]
+    # Avaliações sem sessão entram como um avaliador próprio
+    rater_codes = np.where(rater_codes[keep] < 0, len(raters), rater_codes[keep])
+    n_voices, n_raters = len(voices), len(raters) + 1
+
+    voice_counts = np.bincount(voice_codes, minlength=n_voices)
+    rater_counts = np.bincount(rater_codes, minlength=n_raters)
+    overall = scores.mean() if len(scores) else np.nan
+    residual = scores - overall
+    voice_effect = np.zeros(n_voices)
+    rater_effect = np.zeros(n_raters)
+
+    for _ in range(iterations):
+        previous = voice_effect
+        voice_effect = np.bincount(
+            voice_codes, weights=residual - rater_effect[rater_codes], minlength=n_voices
+        ) / (voice_counts + voice_shrinkage)
+        rater_effect = np.bincount(
+            rater_codes, weights=residual - voice_effect[voice_codes], minlength=n_raters
+        ) / (rater_counts + rater_shrinkage)
+        if np.max(np.abs(voice_effect - previous), initial=0.0) < tolerance:
+            break
+
+    fitted = overall + voice_effect[voice_codes] + rater_effect[rater_codes]
+    dof = max(len(scores) - 1, 1)
+    noise_variance = float(np.sum((scores - fitted) ** 2)) / dof
+    raw_means = np.bincount(voice_codes, weights=scores, minlength=n_voices) / np.maximum(voice_counts, 1)
+
+    present = voice_counts > 0
+    result = pd.DataFrame({
+        "count": voice_counts,
+        "mean": raw_means,
+        "effect": voice_effect,
+        "adjusted_mean": overall + voice_effect,
+        "std_error": np.sqrt(noise_variance / (voice_counts + voice_shrinkage)),
+    }, index=pd.Index(voices, name=voice))[present]
+    result = result.sort_values("adjusted_mean", ascending=False)
+    result["rank"] = np.arange(1, len(result) + 1)
+    return result
@@ -0,0 +1,101 @@
+"""
+Tabela paginada e filtrável das avaliações do painel
+
+Os filtros (categorias, durações, sessão, faixa de notas e janela de tempo)
+viram uma condição SQL executada na cópia local (EvaluationStore), ordenada
+pelo índice de `timestamp`. Só a página pedida é lida e convertida em
+DataFrame, então o custo de exibir a tabela não depende do total de votos.
+A cor das notas é aplicada por coluna, com um único `map` vetorizado.
+"""
+
+import math
+from datetime import datetime, time, timedelta, timezone
+
+import pandas as pd
+
+import labels
+from analytics_aggregates import SCORES
+
+DEFAULT_PAGE_SIZE = 100
+
+SCORE_STYLES = {
+    5: "color: #2e7d32; font-weight: bold;",
+    4: "color: #558b2f; font-weight: bold;",
+    3: "color: #f57c00; font-weight: bold;",
+    2: "color: #e65100; font-weight: bold;",
+    1: "color: #c62828; font-weight: bold;",
+}
+
+DISPLAY_COLUMNS = {
+    "anonymous_id": "ID Anônimo",
+    "score": "Nota",
+    "category": "Categoria",
+    "duration": "Duração",
+    "timestamp": "Data/Hora",
+    "session_id": "ID da Sessão",
+}
+
+
+def _in(column, values):
+    values = list(values)
+    return f"{column} IN ({', '.join('?' * len(values))})", values
+
+
+def build_filter(categories=None, durations=None, session_id=None, min_score=None, max_score=None,
+                 start_date=None, end_date=None):
+    """Condição SQL e parâmetros para os filtros (None ou vazio = sem filtro)
+
+    `start_date`/`end_date` são datas (inclusivas) em UTC.
+    """
+    clauses, params = [], []
+    for column, values in (("category", categories), ("duration", durations)):
+        if values:
+            clause, values = _in(column, values)
+            clauses.append(clause)
+            params.extend(values)
+    if session_id:
+        clauses.append("session_id = ?")
+        params.append(session_id)
+    if min_score is not None and min_score > min(SCORES):
+        clauses.append("score >= ?")
+        params.append(min_score)
+    if max_score is not None and max_score < max(SCORES):
+        clauses.append("score <= ?")
+        params.append(max_score)
+    if start_date is not None:
+        clauses.append("timestamp >= ?")
+        params.append(datetime.combine(start_date, time.min, tzinfo=timezone.utc).timestamp())
+    if end_date is not None:
+        clauses.append("timestamp < ?")
+        params.append(datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc).timestamp())
+    return " AND ".join(clauses) or "1", params
+
+
+def query_page(store, page=1, page_size=DEFAULT_PAGE_SIZE, **filters):
+    """Ler uma página (a partir de 1) das avaliações filtradas
+
+    Retorna (DataFrame da página, total filtrado, número de páginas).
+    """
+    where, params = build_filter(**filters)
+    total = store.count(where, params)
+    pages = max(1, math.ceil(total / page_size))
+    page = min(max(1, page), pages)
+    frame = store.select(where, params, limit=page_size, offset=(page - 1) * page_size)
+    return frame, total, pages
+
+
+def format_page(frame):
+    """Rótulos (ver labels) e estilo da página para exibição (Styler)"""
+    scores = frame["score"].astype("Int64")
+    display = pd.DataFrame({
+        "anonymous_id": frame["anonymous_id"],
+        "score": labels.relabel(scores, labels.SCORE_STAR_LABELS.get),
+        "category": labels.relabel(frame["category"], labels.category_label),
+        "duration": labels.relabel(frame["duration"], labels.duration_label),
+        "timestamp": frame["timestamp"],
+        "session_id": frame["session_id"],
+    }).rename(columns=DISPLAY_COLUMNS)
+
+    # Uma cor por nota, calculada para a coluna inteira de uma vez
+    styles = scores.map(SCORE_STYLES).fillna("").to_numpy()
+    return display.style.apply(lambda _: styles, subset=[DISPLAY_COLUMNS["score"]])
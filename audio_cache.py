@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Cache de áudio em disco, endereçado por conteúdo
+
+Cada arquivo é identificado por bucket/chave/ETag, então uma nova versão do
+objeto no S3 nunca colide com a anterior. O cache tem um orçamento em bytes
+com despejo LRU (pela data de último acesso), leituras via mmap e escritas
+atômicas (arquivo temporário + rename), o que permite que vários processos do
+Streamlit na mesma máquina compartilhem o mesmo diretório.
+
+Uso: python audio_cache.py [diretório]  (mostra uso e contadores)
+"""
+
+import os
+import sys
+import json
+import mmap
+import socket
+import fcntl
+import hashlib
+import tempfile
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "mamae-pingo-audio-cache")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+
+_STATS_DIR = "_stats"
+_ETAGS_DIR = "_etags"
+_LOCK_FILE = ".lock"
+_STATS_FLUSH_EVERY = 50
+
+
+def _scan_entries(directory):
+    """Listar (mtime, tamanho, caminho) de todos os arquivos do cache"""
+    entries = []
+    if not os.path.isdir(directory):
+        return entries
+    for shard in os.scandir(directory):
+        if not shard.is_dir() or shard.name in (_STATS_DIR, _ETAGS_DIR):
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    return entries
+
+
+class DiskAudioCache:
+    """Cache LRU de arquivos de áudio compartilhado entre processos"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "bytes_written": 0}
+        self._pending_stats = 0
+        os.makedirs(os.path.join(directory, _STATS_DIR), exist_ok=True)
+        self._stats_path = os.path.join(
+            directory, _STATS_DIR, f"{socket.gethostname()}-{os.getpid()}.json"
+        )
+
+    @staticmethod
+    def entry_id(bucket, key, etag):
+        """Identificador do conteúdo a partir de bucket/chave/ETag"""
+        etag = (etag or "").strip('"')
+        raw = f"{bucket}/{key}/{etag}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, entry_id):
+        return os.path.join(self.directory, entry_id[:2], entry_id)
+
+    def get(self, bucket, key, etag, count=True):
+        """Retornar um memoryview (mmap) do arquivo em cache, ou None
+
+        Com `count=False` a leitura não entra nos acertos/faltas (ex.: cada
+        pedido Range do servidor de streaming, que tem contadores próprios).
+        """
+        path = self._path(self.entry_id(bucket, key, etag))
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size:
+                    view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                else:
+                    view = memoryview(b"")
+            # Atualiza o horário de acesso usado pelo LRU
+            os.utime(path)
+        except FileNotFoundError:
+            if count:
+                self._count("misses")
+            return None
+        if count:
+            self._count("hits")
+        return view
+
+    def put(self, bucket, key, etag, data):
+        """Gravar o conteúdo de forma atômica e aplicar o orçamento de bytes"""
+        return self.put_stream(bucket, key, etag, (data,))
+
+    def put_stream(self, bucket, key, etag, chunks):
+        """Gravar o conteúdo recebido em blocos (sem juntá-lo na memória), de forma atômica"""
+        path = self._path(self.entry_id(bucket, key, etag))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        written = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    written += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self._count("bytes_written", written)
+        self._remember_etag(bucket, key, etag)
+        self._evict(keep=path)
+        return path
+
+    def _etag_path(self, bucket, key):
+        return os.path.join(self.directory, _ETAGS_DIR, self.entry_id(bucket, key, ""))
+
+    def _remember_etag(self, bucket, key, etag):
+        path = self._etag_path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write((etag or "").strip('"'))
+        os.replace(tmp_path, path)
+
+    def latest_etag(self, bucket, key):
+        """ETag da última versão gravada para bucket/chave (para revalidar com If-None-Match)"""
+        try:
+            with open(self._etag_path(bucket, key)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def get_or_fill(self, bucket, key, etag, loader):
+        """Retornar do cache ou chamar `loader()` (que retorna bytes ou None) e gravar"""
+        view = self.get(bucket, key, etag)
+        if view is not None:
+            return view
+        data = loader()
+        if data is None:
+            return None
+        self.put(bucket, key, etag, data)
+        return memoryview(data)
+
+    def _evict(self, keep=None):
+        """Remover os arquivos menos usados até caber no orçamento"""
+        with open(os.path.join(self.directory, _LOCK_FILE), "a") as lock:
+            # Trava entre processos para que dois despejos não corram juntos
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = _scan_entries(self.directory)
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                self._count("evictions")
+        self._flush_stats()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+            self._pending_stats += 1
+            flush = self._pending_stats >= _STATS_FLUSH_EVERY
+        if flush:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        """Publicar os contadores deste processo para o relatório do CLI
+
+        Best effort: cada thread escreve no seu próprio temporário, e uma
+        falha ao publicar nunca interrompe a operação do cache que a disparou.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            self._pending_stats = 0
+        tmp_path = f"{self._stats_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(counters, f)
+            os.replace(tmp_path, self._stats_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Contadores deste processo e ocupação atual do disco"""
+        with self._lock:
+            counters = dict(self._counters)
+        entries = _scan_entries(self.directory)
+        counters.update({
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        })
+        return counters
+
+
+def report(directory):
+    """Somar os contadores publicados por todos os processos"""
+    totals = {"hits": 0, "misses": 0, "evictions": 0, "bytes_written": 0}
+    stats_dir = os.path.join(directory, _STATS_DIR)
+    processes = 0
+    for name in os.listdir(stats_dir) if os.path.isdir(stats_dir) else []:
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(stats_dir, name)) as f:
+            counters = json.load(f)
+        processes += 1
+        for k in totals:
+            totals[k] += counters.get(k, 0)
+    entries = _scan_entries(directory)
+    lookups = totals["hits"] + totals["misses"]
+    print(f"📁 Cache: {directory}")
+    print(f"   Arquivos: {len(entries)} ({sum(s for _, s, _ in entries) / 1024 / 1024:.1f} MB)")
+    print(f"   Processos: {processes}")
+    print(f"   Acertos: {totals['hits']}  Faltas: {totals['misses']}  Despejos: {totals['evictions']}")
+    if lookups:
+        print(f"   Taxa de acerto: {totals['hits'] / lookups * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    report(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CACHE_DIR)
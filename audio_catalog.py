@@ -0,0 +1,321 @@
+"""
+Catálogo de arquivos de áudio
+
+O catálogo vem do manifesto `{S3_PREFIX}metadata.json` gerado pelo
+upload_to_s3.py, baixado em um único GET. Uma cópia local é guardada com o
+ETag do manifesto, e as inicializações seguintes fazem um GET condicional
+(If-None-Match): se o manifesto não mudou, o S3 responde 304 sem corpo e a
+cópia local é usada. Só quando o manifesto não existe o prefixo inteiro é
+listado, como antes.
+
+Depois de carregado, o AudioCatalog é atualizado em segundo plano: a listagem
+atual do S3 é comparada com o catálogo por chave/ETag/LastModified e apenas
+as adições, remoções e alterações são aplicadas. Cada atualização publica uma
+nova lista (cópia na escrita), ordenada pela chave S3, então as listas já
+entregues às sessões em andamento nunca mudam e a ordem base é determinística.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import deque
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+MANIFEST_NAME = "metadata.json"
+MANIFEST_VERSION = 2
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".m4a", ".ogg", ".opus")
+CONTENT_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".flac": "audio/flac",
+    ".m4a": "audio/mp4",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+}
+
+# Clipes a partir desta duração (segundos) são classificados como "longo"
+LONG_CLIP_SECONDS = float(os.getenv("LONG_CLIP_SECONDS", 30))
+
+# Originais dos áudios transcodificados ficam em `{S3_PREFIX}originals/` e não entram no catálogo
+ORIGINALS_DIR = "originals"
+
+DEFAULT_CATALOG_CACHE_DIR = os.path.join(tempfile.gettempdir(), "mamae-pingo-catalog")
+
+
+def manifest_key(prefix):
+    """Chave do manifesto no S3"""
+    return f"{prefix}{MANIFEST_NAME}"
+
+
+def originals_prefix(prefix):
+    """Prefixo no S3 dos arquivos originais (antes da transcodificação)"""
+    return f"{prefix}{ORIGINALS_DIR}/"
+
+
+def content_type_for(name):
+    """MIME do áudio pela extensão do arquivo"""
+    return CONTENT_TYPES.get(os.path.splitext(name)[1].lower(), "application/octet-stream")
+
+
+def duration_class(filename, seconds=None):
+    """Classe de duração ("curto"/"longo") pela duração medida
+
+    Sem a duração (catálogo montado pela listagem do S3), usa o nome do
+    arquivo: os "pingocast" são os clipes longos.
+    """
+    if seconds is not None:
+        return 'longo' if seconds >= LONG_CLIP_SECONDS else 'curto'
+    return 'longo' if 'pingocast' in filename.lower() else 'curto'
+
+
+def stable_audio_id(s3_key, content_hash):
+    """ID anônimo estável: depende só da chave completa no S3 e do hash do conteúdo (ETag)
+
+    Não depende da ordem da listagem, então adicionar ou remover outros
+    arquivos não muda o ID deste. Um novo conteúdo na mesma chave gera outro ID.
+    """
+    content_hash = (content_hash or "").strip('"')
+    digest = hashlib.sha256(f"{s3_key}\n{content_hash}".encode()).hexdigest()
+    return f"audio_{digest[:16]}"
+
+
+def entry_from_object(bucket, prefix, key, etag, last_modified=None, size=None):
+    """Montar a entrada do catálogo a partir de um objeto listado no S3"""
+    parts = key.replace(prefix, '').split('/')
+    category = parts[0] if len(parts) > 1 else 'raiz'
+    filename = parts[-1]
+
+    return {
+        "anonymous_id": stable_audio_id(key, etag),
+        "original_name": filename,
+        "category": category,
+        "duration": duration_class(filename),
+        "duration_seconds": None,
+        "size_bytes": size,
+        "s3_key": key,
+        "bucket": bucket,
+        "etag": (etag or "").strip('"'),
+        "last_modified": last_modified.isoformat() if last_modified else None,
+        "content_type": content_type_for(key)
+    }
+
+
+def iter_audio_objects(s3_client, bucket, prefix):
+    """Percorrer os objetos de áudio do prefixo no S3"""
+    originals = originals_prefix(prefix)
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+
+            # Ignorar o arquivo de metadata, diretórios e os originais dos transcodificados
+            if key.endswith(".json") or key.endswith('/') or key.startswith(originals):
+                continue
+
+            if key.endswith(AUDIO_EXTENSIONS):
+                yield obj
+
+
+def list_audio_files(s3_client, bucket, prefix):
+    """Listar o prefixo inteiro no S3 e montar o catálogo (fallback sem manifesto)"""
+    return [
+        entry_from_object(bucket, prefix, obj["Key"], obj.get("ETag"), obj.get("LastModified"), obj.get("Size"))
+        for obj in iter_audio_objects(s3_client, bucket, prefix)
+    ]
+
+
+def _local_manifest_path(cache_dir, bucket, prefix):
+    name = hashlib.sha256(f"{bucket}/{manifest_key(prefix)}".encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"manifest-{name}.json")
+
+
+def _read_local_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_local_manifest(path, etag, manifest):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"etag": etag, "manifest": manifest}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def fetch_manifest(s3_client, bucket, prefix, cache_dir=DEFAULT_CATALOG_CACHE_DIR):
+    """Baixar o manifesto, revalidando a cópia local pelo ETag
+
+    Retorna (manifesto, etag), ou (None, None) se o manifesto não existir.
+    """
+    local_path = _local_manifest_path(cache_dir, bucket, prefix)
+    local = _read_local_manifest(local_path)
+
+    params = {"Bucket": bucket, "Key": manifest_key(prefix)}
+    if local:
+        params["IfNoneMatch"] = local["etag"]
+
+    try:
+        response = s3_client.get_object(**params)
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code in ("304", "NotModified") and local:
+            return local["manifest"], local["etag"]
+        if code in ("NoSuchKey", "404"):
+            return None, None
+        if local:
+            # S3 indisponível: usa a última cópia conhecida
+            return local["manifest"], local["etag"]
+        raise
+    except BotoCoreError:
+        # Sem conexão com o S3 (DNS, timeout, credenciais): mesma regra
+        if local:
+            return local["manifest"], local["etag"]
+        raise
+
+    manifest = json.loads(response["Body"].read())
+    etag = response["ETag"]
+    _write_local_manifest(local_path, etag, manifest)
+    return manifest, etag
+
+
+def entries_from_manifest(manifest, bucket):
+    """Normalizar as entradas do manifesto (versão 1 não tinha ETag)"""
+    files = []
+    for entry in manifest.get("files", []):
+        entry = dict(entry)
+        entry.setdefault("bucket", bucket)
+        entry.setdefault("etag", "")
+        entry.setdefault("content_type", content_type_for(entry["s3_key"]))
+        if entry["etag"]:
+            entry["anonymous_id"] = stable_audio_id(entry["s3_key"], entry["etag"])
+        files.append(entry)
+    return files
+
+
+def fill_missing_etags(s3_client, bucket, prefix, files):
+    """Completar pela listagem do S3 as entradas sem ETag (manifesto v1)
+
+    O manifesto v1, gravado pelo uploader antigo, traz os IDs por posição
+    (`audio_<md5>_<n>`). Com o ETag da listagem, essas entradas passam a
+    usar o ID estável, o mesmo que o app e a migração das avaliações usam.
+    """
+    if all(entry["etag"] for entry in files):
+        return files
+    listed = {obj["Key"]: obj for obj in iter_audio_objects(s3_client, bucket, prefix)}
+    for entry in files:
+        obj = listed.get(entry["s3_key"])
+        if entry["etag"] or obj is None:
+            continue
+        entry["etag"] = obj.get("ETag", "").strip('"')
+        entry["anonymous_id"] = stable_audio_id(entry["s3_key"], entry["etag"])
+        entry["last_modified"] = obj["LastModified"].isoformat() if obj.get("LastModified") else None
+        entry["size_bytes"] = obj.get("Size")
+    return files
+
+
+def load_catalog(s3_client, bucket, prefix, cache_dir=DEFAULT_CATALOG_CACHE_DIR):
+    """Carregar o catálogo pelo manifesto, listando o S3 só se ele não existir ou não tiver ETags"""
+    manifest, _ = fetch_manifest(s3_client, bucket, prefix, cache_dir)
+    if manifest is None or manifest.get("manifest_version", 1) > MANIFEST_VERSION:
+        return list_audio_files(s3_client, bucket, prefix)
+    return fill_missing_etags(s3_client, bucket, prefix, entries_from_manifest(manifest, bucket))
+
+
+class AudioCatalog:
+    """Catálogo compartilhado entre sessões, atualizado incrementalmente em segundo plano"""
+
+    def __init__(self, s3_client, bucket, prefix, cache_dir=DEFAULT_CATALOG_CACHE_DIR, history_size=50):
+        self._s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refresh_history = deque(maxlen=history_size)
+
+        files = load_catalog(s3_client, bucket, prefix, cache_dir)
+        self._entries = {entry["s3_key"]: entry for entry in files}
+        self._snapshot = sorted(self._entries.values(), key=lambda entry: entry["s3_key"])
+        self.version = 1
+
+    def snapshot(self):
+        """Lista atual de áudios (não deve ser modificada; é compartilhada)"""
+        with self._lock:
+            return self._snapshot
+
+    def refresh(self):
+        """Comparar a listagem do S3 com o catálogo e aplicar só as diferenças"""
+        started = time.monotonic()
+        listed = {obj["Key"]: obj for obj in iter_audio_objects(self._s3_client, self.bucket, self.prefix)}
+        listed_seconds = time.monotonic() - started
+
+        with self._lock:
+            entries = self._entries
+            added = [key for key in listed if key not in entries]
+            removed = [key for key in entries if key not in listed]
+            changed = []
+            for key, obj in listed.items():
+                entry = entries.get(key)
+                if entry is None:
+                    continue
+                etag = obj.get("ETag", "").strip('"')
+                last_modified = obj["LastModified"].isoformat() if obj.get("LastModified") else None
+                if entry.get("etag") != etag or (entry.get("last_modified") and entry["last_modified"] != last_modified):
+                    changed.append((key, etag, last_modified, obj.get("Size")))
+
+            if added or removed or changed:
+                # Cópia na escrita: as entradas e listas anteriores continuam intactas
+                new_entries = dict(entries)
+                for key in removed:
+                    del new_entries[key]
+                for key, etag, last_modified, size in changed:
+                    # Conteúdo novo recebe novo ID
+                    new_entries[key] = {**new_entries[key], "etag": etag, "last_modified": last_modified,
+                                        "size_bytes": size, "anonymous_id": stable_audio_id(key, etag)}
+                for key in added:
+                    obj = listed[key]
+                    new_entries[key] = entry_from_object(
+                        self.bucket, self.prefix, key, obj.get("ETag"), obj.get("LastModified"), obj.get("Size")
+                    )
+                self._entries = new_entries
+                self._snapshot = sorted(new_entries.values(), key=lambda entry: entry["s3_key"])
+                self.version += 1
+
+            stats = {
+                "finished_at": time.time(),
+                "list_seconds": listed_seconds,
+                "total_seconds": time.monotonic() - started,
+                "objects": len(listed),
+                "added": len(added),
+                "removed": len(removed),
+                "changed": len(changed),
+                "version": self.version,
+            }
+            self.refresh_history.append(stats)
+        return stats
+
+    def start(self, interval_seconds):
+        """Iniciar a atualização periódica em uma thread em segundo plano"""
+        if self._thread is not None or interval_seconds <= 0:
+            return
+
+        def run():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.refresh_history.append({"finished_at": time.time(), "error": str(e)})
+
+        self._thread = threading.Thread(target=run, name="catalog-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,40 @@
+"""
+Estratégias de entrega do áudio ao navegador
+
+- "url": o st.audio recebe a URL pré-assinada e o navegador baixa o arquivo
+  direto do S3 (com suporte a Range), sem passar pelo processo do Streamlit
+- "proxy": o processo do Streamlit baixa os bytes e os entrega ao st.audio
+  (comportamento original, mantido como fallback)
+- "stream": o st.audio recebe uma URL assinada do servidor de streaming local
+  (audio_stream_server), que atende pedidos Range a partir do cache em disco
+  ou do S3; a reprodução e os saltos não esperam o download completo
+"""
+
+DELIVERY_URL = "url"
+DELIVERY_PROXY = "proxy"
+DELIVERY_STREAM = "stream"
+DELIVERY_MODES = (DELIVERY_URL, DELIVERY_PROXY, DELIVERY_STREAM)
+
+
+def resolve_delivery_mode(value, default=DELIVERY_URL):
+    """Normalizar o modo de entrega configurado, usando o padrão se for inválido"""
+    mode = str(value or default).strip().lower()
+    return mode if mode in DELIVERY_MODES else default
+
+
+def resolve_audio_source(mode, presign, download, stream=None):
+    """Retornar o que deve ser passado ao st.audio (URL ou bytes)
+
+    `presign`, `download` e `stream` são funções sem argumentos. Nos modos
+    "url" e "stream", se a URL não puder ser gerada, cai para o download via
+    proxy.
+    """
+    if mode == DELIVERY_URL:
+        url = presign()
+        if url:
+            return url
+    elif mode == DELIVERY_STREAM and stream is not None:
+        url = stream()
+        if url:
+            return url
+    return download()
@@ -0,0 +1,180 @@
+"""
+Leitura dos áudios do S3 pelo servidor
+
+Os downloads feitos pelo processo do app (página no modo proxy,
+pré-carregamento e preenchimento do cache) usam o `GetObject` do próprio
+cliente boto3, sem passar por uma URL pré-assinada: o pool de conexões
+(keep-alive), os timeouts e as retentativas com jitter são os do botocore,
+configurados por `s3_config`. URLs pré-assinadas ficam só para o navegador
+(modo "url").
+
+O corpo é lido em blocos e gravado direto no cache em disco, sem juntar o
+arquivo na memória. Quando o catálogo não traz o ETag, o pedido leva
+`If-None-Match` com o ETag da cópia em cache: se o objeto não mudou, o S3
+responde 304 sem corpo e a cópia é reaproveitada. A latência de cada
+`GetObject` vai para um histograma, separado por resultado.
+"""
+
+import time
+import bisect
+import threading
+
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_RETRIES = 3
+CHUNK_SIZE = 256 * 1024
+
+# Limites superiores (segundos) das faixas do histograma; a última é ilimitada
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def s3_config(pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+              read_timeout=DEFAULT_READ_TIMEOUT, retries=DEFAULT_RETRIES):
+    """Configuração do cliente boto3: pool compartilhado, timeouts e retentativas com jitter
+
+    O modo "standard" do botocore repete erros de conexão, timeouts, 429 e
+    5xx com espera exponencial e jitter; `retries` é o número de repetições
+    além da primeira tentativa.
+    """
+    return Config(
+        max_pool_connections=pool_size,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={"total_max_attempts": retries + 1, "mode": "standard"},
+        tcp_keepalive=True,
+    )
+
+
+class LatencyHistogram:
+    """Histograma de latências com faixas fixas (thread-safe)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += seconds
+
+    def quantile(self, q):
+        """Limite superior da faixa que contém o quantil `q` (None sem dados)"""
+        with self._lock:
+            counts, total = list(self._counts), self._count
+        if not total:
+            return None
+        target = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= target and count:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f"<={bound}s" for bound in self.buckets] + [f">{self.buckets[-1]}s"]
+            return {
+                "count": self._count,
+                "mean_seconds": self._sum / self._count if self._count else None,
+                "buckets": dict(zip(labels, self._counts)),
+            }
+
+
+class S3AudioReader:
+    """GetObject em blocos para o cache em disco, com revalidação por ETag e métricas"""
+
+    def __init__(self, s3_client, audio_cache, chunk_size=CHUNK_SIZE):
+        self._s3_client = s3_client
+        self._cache = audio_cache
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "not_modified": 0, "failures": 0, "bytes": 0}
+        self.latency = {"ok": LatencyHistogram(), "not_modified": LatencyHistogram(), "error": LatencyHistogram()}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _get_object(self, params):
+        self._count("requests")
+        started = time.monotonic()
+        try:
+            response = self._s3_client.get_object(**params)
+        except ClientError as e:
+            elapsed = time.monotonic() - started
+            if e.response.get("Error", {}).get("Code") in ("304", "NotModified"):
+                self.latency["not_modified"].observe(elapsed)
+                self._count("not_modified")
+                return None
+            self.latency["error"].observe(elapsed)
+            self._count("failures")
+            raise
+        self.latency["ok"].observe(time.monotonic() - started)
+        return response
+
+    def _chunks(self, body):
+        try:
+            for chunk in body.iter_chunks(self.chunk_size):
+                self._count("bytes", len(chunk))
+                yield chunk
+        finally:
+            body.close()
+
+    def fetch(self, bucket, key, etag=None):
+        """Retornar o conteúdo (memoryview) do cache, baixando do S3 se preciso
+
+        Com o ETag do catálogo, a cópia em cache é endereçada por ele e nenhum
+        pedido é feito. Sem ele, a última cópia gravada é revalidada com
+        If-None-Match.
+        """
+        etag = (etag or "").strip('"')
+        if etag:
+            view = self._cache.get(bucket, key, etag)
+            if view is not None:
+                return view
+
+        params = {"Bucket": bucket, "Key": key}
+        cached_etag = None if etag else self._cache.latest_etag(bucket, key)
+        if cached_etag:
+            params["IfNoneMatch"] = f'"{cached_etag}"'
+
+        response = self._get_object(params)
+        if response is None:
+            view = self._cache.get(bucket, key, cached_etag)
+            if view is not None:
+                return view
+            # A cópia foi despejada entre a consulta e a leitura: baixa de novo
+            del params["IfNoneMatch"]
+            response = self._get_object(params)
+
+        # A cópia é gravada sob o ETag da resposta: se o catálogo estiver
+        # desatualizado, o conteúdo novo não fica rotulado com o ETag antigo
+        stored_etag = response["ETag"].strip('"')
+        try:
+            self._cache.put_stream(bucket, key, stored_etag, self._chunks(response["Body"]))
+        except OSError:
+            # Falha no cache (ex.: disco cheio) não deve impedir a reprodução
+            return memoryview(b"".join(self._chunks(self._get_object({"Bucket": bucket, "Key": key})["Body"])))
+        view = self._cache.get(bucket, key, stored_etag, count=False)
+        if view is None:
+            raise RuntimeError(f"Áudio removido do cache logo após o download: {key}")
+        return view
+
+    def stats(self):
+        """Contadores e histogramas de latência (por resultado do GetObject)"""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["latency"] = {name: histogram.snapshot() for name, histogram in self.latency.items()}
+        counters["p50_seconds"] = self.latency["ok"].quantile(0.5)
+        counters["p99_seconds"] = self.latency["ok"].quantile(0.99)
+        return counters
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Metadados técnicos dos áudios lidos só dos cabeçalhos
+
+Duração, taxa de amostragem, canais e tamanho em bytes de cada clipe, sem
+decodificar o áudio: WAV (PCM) é lido pelo módulo `wave`, que só interpreta o
+cabeçalho; os demais formatos (e WAVs que o `wave` não entende, como float
+ou WAVE_FORMAT_EXTENSIBLE) passam pelo ffprobe, que lê os cabeçalhos do
+contêiner. Sem ffprobe disponível, só o tamanho é preenchido.
+
+Uso: python audio_metadata.py arquivo [arquivo ...]
+"""
+
+import os
+import sys
+import json
+import wave
+import shutil
+import subprocess
+
+
+def ffprobe_binary():
+    """Executável do ffprobe (FFPROBE_BINARY, lido na hora para respeitar o .env)"""
+    return os.getenv('FFPROBE_BINARY', 'ffprobe')
+
+
+def _empty(path):
+    return {
+        'duration_seconds': None,
+        'sample_rate': None,
+        'channels': None,
+        'size_bytes': os.path.getsize(path),
+    }
+
+
+def _probe_wav(path):
+    with wave.open(path, 'rb') as f:
+        frames, rate = f.getnframes(), f.getframerate()
+        return {
+            'duration_seconds': round(frames / rate, 3) if rate else None,
+            'sample_rate': rate,
+            'channels': f.getnchannels(),
+            'size_bytes': os.path.getsize(path),
+        }
+
+
+def _probe_ffprobe(path, binary):
+    result = subprocess.run(
+        [binary, '-v', 'error', '-select_streams', 'a:0',
+         '-show_entries', 'format=duration:stream=sample_rate,channels,duration',
+         '-of', 'json', path],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    if result.returncode != 0:
+        return None
+    data = json.loads(result.stdout or '{}')
+    stream = (data.get('streams') or [{}])[0]
+    duration = data.get('format', {}).get('duration') or stream.get('duration')
+    return {
+        'duration_seconds': round(float(duration), 3) if duration not in (None, 'N/A') else None,
+        'sample_rate': int(stream['sample_rate']) if stream.get('sample_rate') else None,
+        'channels': stream.get('channels'),
+        'size_bytes': os.path.getsize(path),
+    }
+
+
+def probe_audio(path):
+    """Duração (s), taxa de amostragem, canais e tamanho do arquivo; campos desconhecidos ficam None"""
+    if path.lower().endswith('.wav'):
+        try:
+            return _probe_wav(path)
+        except (wave.Error, EOFError):
+            pass  # formato que o `wave` não suporta: tenta o ffprobe
+    binary = shutil.which(ffprobe_binary())
+    if binary:
+        info = _probe_ffprobe(path, binary)
+        if info is not None:
+            return info
+    return _empty(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    for name in sys.argv[1:]:
+        print(name, json.dumps(probe_audio(name)))
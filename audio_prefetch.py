@@ -0,0 +1,73 @@
+"""
+Pré-carregamento de áudios em segundo plano
+
+Enquanto o avaliador ouve o áudio atual, os próximos da lista são baixados
+para o cache por um pool de threads. Buscas em andamento são deduplicadas:
+se o mesmo áudio for pedido de novo (pelo pré-carregamento ou pela página),
+quem pediu depois espera pela busca já iniciada. Se a busca ainda estiver
+na fila do pool, a página a executa na própria thread em vez de esperar.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class AudioPrefetcher:
+    """Pool de threads que executa `fetch(*args)` sem repetir buscas em andamento"""
+
+    def __init__(self, fetch, max_workers=4):
+        self._fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audio-prefetch")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def _claim(self, args):
+        """Retornar (future, novo) para os argumentos, reaproveitando o que estiver em andamento"""
+        with self._lock:
+            future = self._in_flight.get(args)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._in_flight[args] = future
+            return future, True
+
+    def _start(self, future):
+        """Marcar a busca como iniciada; False se outra thread já a iniciou"""
+        with self._lock:
+            if future.running() or future.done():
+                return False
+            return future.set_running_or_notify_cancel()
+
+    def _run(self, args, future):
+        if not self._start(future):
+            return
+        try:
+            future.set_result(self._fetch(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(args, None)
+
+    def prefetch(self, jobs):
+        """Agendar buscas em segundo plano; `jobs` é uma lista de tuplas de argumentos"""
+        for args in jobs:
+            future, created = self._claim(tuple(args))
+            if created:
+                self._executor.submit(self._run, tuple(args), future)
+
+    def fetch(self, *args, timeout=None):
+        """Buscar agora, esperando por uma busca em andamento se houver"""
+        future, _ = self._claim(args)
+        # Executa na própria thread de quem pediu para não esperar na fila do
+        # pool; se o pré-carregamento já começou, só espera pelo resultado
+        self._run(args, future)
+        return future.result(timeout=timeout)
+
+    def in_flight(self):
+        """Quantidade de buscas em andamento"""
+        with self._lock:
+            return len(self._in_flight)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP de streaming de áudio com suporte a Range
+
+Roda ao lado do Streamlit (uma thread no mesmo processo) e entrega os
+clipes ao `<audio>` do navegador com `Accept-Ranges: bytes`: a reprodução
+começa com os primeiros blocos e um salto pede só os bytes a partir do
+ponto escolhido, em vez de esperar o arquivo inteiro como no modo proxy.
+
+Os bytes vêm do cache de áudio em disco (mmap, sem cópia) quando o clipe já
+foi baixado; senão, o pedido é repassado ao S3 como um GetObject com o
+mesmo Range e o corpo é transmitido em blocos, sem passar inteiro pela
+memória. As URLs são assinadas com HMAC (bucket, chave, ETag e validade),
+então o servidor só entrega os clipes que o app autorizou.
+
+Uso: python audio_stream_server.py [porta]  (servidor avulso, lê o .env)
+"""
+
+import os
+import sys
+import hmac
+import time
+import base64
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import boto3
+from dotenv import load_dotenv
+from botocore.exceptions import ClientError
+
+from audio_cache import DEFAULT_CACHE_DIR, DiskAudioCache
+from audio_catalog import content_type_for
+
+DEFAULT_STREAM_PORT = 8503
+DEFAULT_TOKEN_TTL = 7200
+CHUNK_SIZE = 64 * 1024
+
+
+def sign_token(secret, bucket, key, etag, expires):
+    """Assinatura HMAC-SHA256 de bucket/chave/ETag/validade (base64 url-safe)"""
+    if isinstance(secret, str):
+        secret = secret.encode()
+    etag = (etag or "").strip('"')
+    message = f"{bucket}\n{key}\n{etag}\n{int(expires)}".encode()
+    digest = hmac.new(secret, message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def verify_token(secret, bucket, key, etag, expires, token, now=None):
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < (now if now is not None else time.time()):
+        return False
+    return hmac.compare_digest(sign_token(secret, bucket, key, etag, expires), token or "")
+
+
+def stream_url(base_url, secret, bucket, key, etag, ttl=DEFAULT_TOKEN_TTL):
+    """URL assinada do clipe neste servidor"""
+    expires = int(time.time()) + ttl
+    query = urlencode({
+        "b": bucket,
+        "k": key,
+        "e": (etag or "").strip('"'),
+        "x": expires,
+        "t": sign_token(secret, bucket, key, etag, expires),
+    })
+    return f"{base_url.rstrip('/')}/audio?{query}"
+
+
+def parse_range(header, size):
+    """Intervalo (início, fim inclusivo) pedido no cabeçalho Range
+
+    Retorna None para o arquivo inteiro (sem Range, Range malformado ou com
+    vários intervalos, que podem ser ignorados) e ValueError se o intervalo
+    não cabe no arquivo (416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    try:
+        if not start:
+            # Sufixo: os últimos N bytes
+            length = int(end)
+            if length <= 0:
+                raise ValueError(header)
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+class AudioStreamHandler(BaseHTTPRequestHandler):
+    """GET/HEAD /audio?b=&k=&e=&x=&t= com Range, do cache em disco ou do S3"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "MamaePingoAudio/1.0"
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def log_message(self, *args):
+        pass
+
+    def _serve(self, send_body):
+        url = urlsplit(self.path)
+        if url.path != "/audio":
+            return self._error(404)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        bucket, key, etag = params.get("b"), params.get("k"), params.get("e", "")
+        if not bucket or not key or not verify_token(
+            self.server.secret, bucket, key, etag, params.get("x"), params.get("t")
+        ):
+            return self._error(403)
+
+        try:
+            # Uma reprodução faz vários pedidos Range: contados em `counters`, não no cache
+            view = self.server.audio_cache.get(bucket, key, etag, count=False) if self.server.audio_cache else None
+            if view is not None:
+                self.server.count("cache")
+                self._serve_view(view, key, etag, send_body)
+            else:
+                self.server.count("s3")
+                self._serve_s3(bucket, key, etag, send_body)
+        except (BrokenPipeError, ConnectionResetError):
+            # O navegador cancela a resposta anterior ao saltar no áudio
+            self.close_connection = True
+
+    def _send_headers(self, status, key, etag, length, content_range=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type_for(key))
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Cache-Control", "private, max-age=3600")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if etag:
+            self.send_header("ETag", f'"{etag}"')
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def _serve_view(self, view, key, etag, send_body):
+        size = len(view)
+        try:
+            byte_range = parse_range(self.headers.get("Range"), size)
+        except ValueError:
+            return self._error(416, f"bytes */{size}")
+
+        if byte_range is None:
+            start, end, status, content_range = 0, size - 1, 200, None
+        else:
+            start, end = byte_range
+            status, content_range = 206, f"bytes {start}-{end}/{size}"
+        self._send_headers(status, key, etag, end - start + 1, content_range)
+        if send_body:
+            for offset in range(start, end + 1, CHUNK_SIZE):
+                self.wfile.write(view[offset:min(offset + CHUNK_SIZE, end + 1)])
+
+    def _serve_s3(self, bucket, key, etag, send_body):
+        params = {"Bucket": bucket, "Key": key}
+        if etag:
+            # Nunca misturar bytes de outra versão do objeto
+            params["IfMatch"] = f'"{etag}"'
+        range_header = self.headers.get("Range")
+        if send_body and range_header and range_header.startswith("bytes=") and "," not in range_header:
+            params["Range"] = range_header
+
+        try:
+            if send_body:
+                response = self.server.s3_client.get_object(**params)
+            else:
+                response = self.server.s3_client.head_object(**params)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("InvalidRange", "416"):
+                return self._error(416)
+            if code in ("NoSuchKey", "404", "PreconditionFailed", "412"):
+                return self._error(404)
+            return self._error(502)
+
+        length = response["ContentLength"]
+        content_range = response.get("ContentRange")
+        status = 206 if content_range else 200
+        if not send_body:
+            # HEAD: o intervalo é calculado a partir do tamanho total
+            try:
+                byte_range = parse_range(range_header, length)
+            except ValueError:
+                return self._error(416, f"bytes */{length}")
+            if byte_range is not None:
+                start, end = byte_range
+                status, content_range = 206, f"bytes {start}-{end}/{length}"
+                length = end - start + 1
+        self._send_headers(status, key, etag, length, content_range)
+        if not send_body:
+            return
+
+        body = response["Body"]
+        try:
+            for chunk in body.iter_chunks(CHUNK_SIZE):
+                self.wfile.write(chunk)
+        finally:
+            body.close()
+
+        if self.server.on_miss is not None:
+            # Aquece o cache para os próximos pedidos deste clipe
+            self.server.on_miss(bucket, key, etag)
+
+    def _error(self, status, content_range=None):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+
+class AudioStreamServer(ThreadingHTTPServer):
+    """Servidor de streaming com o cliente S3, o cache e o segredo das URLs"""
+
+    daemon_threads = True
+
+    def __init__(self, s3_client, audio_cache, secret, host="0.0.0.0", port=DEFAULT_STREAM_PORT, on_miss=None):
+        super().__init__((host, port), AudioStreamHandler)
+        self.s3_client = s3_client
+        self.audio_cache = audio_cache
+        self.secret = secret if isinstance(secret, bytes) else secret.encode()
+        self.on_miss = on_miss
+        self._lock = threading.Lock()
+        self.counters = {"cache": 0, "s3": 0}
+        self._thread = None
+
+    def count(self, source):
+        with self._lock:
+            self.counters[source] += 1
+
+    def start(self):
+        """Atender em uma thread em segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.serve_forever, name="audio-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv("AUDIO_STREAM_PORT", DEFAULT_STREAM_PORT))
+    secret = os.getenv("AUDIO_STREAM_SECRET")
+    if not secret:
+        print("❌ Defina AUDIO_STREAM_SECRET (o mesmo usado pelo app para assinar as URLs)")
+        sys.exit(1)
+    s3_client = boto3.client(
+        "s3",
+        region_name=os.getenv("AWS_REGION", "us-east-1"),
+        endpoint_url=os.getenv("AWS_ENDPOINT_URL") or None
+    )
+    cache = DiskAudioCache(os.getenv("AUDIO_CACHE_DIR", DEFAULT_CACHE_DIR))
+    server = AudioStreamServer(s3_client, cache, secret, port=port)
+    print(f"🎧 Servidor de streaming de áudio em http://0.0.0.0:{port}/audio")
+    server.serve_forever()
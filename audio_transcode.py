@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Transcodificação e normalização de loudness dos áudios antes do upload
+
+Cada clipe é convertido com o ffmpeg para um formato compacto de streaming
+(Opus em Ogg ou AAC em MP4) com a loudness normalizada em duas passadas:
+a primeira mede o áudio com o filtro `loudnorm` e a segunda aplica um ganho
+linear até o alvo (sem compressão dinâmica, que alteraria a voz avaliada).
+Assim, diferenças de volume entre as gravações não influenciam as notas.
+
+Os arquivos gerados ficam em uma pasta por configuração (formato, taxa e
+alvo de loudness) e são reaproveitados enquanto forem mais novos que o
+original. Vários clipes são processados em paralelo, um processo do ffmpeg
+por núcleo.
+
+Uso: python audio_transcode.py arquivo.wav [saída.opus]
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_TRANSCODE_DIR = '.transcoded'
+
+# formato: (extensão, argumentos do codificador, taxa de amostragem de saída)
+TRANSCODE_FORMATS = {
+    'opus': ('.opus', ['-c:a', 'libopus', '-application', 'audio'], 48000),
+    'aac': ('.m4a', ['-c:a', 'aac', '-movflags', '+faststart'], 44100),
+}
+DEFAULT_FORMAT = 'opus'
+DEFAULT_BITRATE = '64k'
+
+# Alvo de loudness (EBU R128): integrada em LUFS, pico verdadeiro em dBTP e faixa em LU
+DEFAULT_LOUDNESS = -16.0
+DEFAULT_TRUE_PEAK = -1.5
+DEFAULT_LOUDNESS_RANGE = 11.0
+
+_TIME_PATTERN = re.compile(r'time=(\d+):(\d+):(\d+(?:\.\d+)?)')
+
+
+class TranscodeError(RuntimeError):
+    """Falha do ffmpeg ao medir ou converter um arquivo"""
+
+
+def ffmpeg_binary():
+    """Executável do ffmpeg (FFMPEG_BINARY, lido na hora para respeitar o .env)"""
+    return os.getenv('FFMPEG_BINARY', 'ffmpeg')
+
+
+def ffmpeg_available(binary=None):
+    return shutil.which(binary or ffmpeg_binary()) is not None
+
+
+def _run_ffmpeg(args, binary=None):
+    """Executar o ffmpeg e retornar a saída de erro (onde ficam as medições)"""
+    result = subprocess.run(
+        [binary or ffmpeg_binary(), '-hide_banner', '-nostdin', *args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='replace'
+    )
+    if result.returncode != 0:
+        raise TranscodeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'ffmpeg falhou')
+    return result.stderr
+
+
+def _loudnorm_filter(loudness, true_peak, loudness_range, measured=None):
+    options = [f'I={loudness}', f'TP={true_peak}', f'LRA={loudness_range}']
+    if measured:
+        options += [
+            f"measured_I={measured['input_i']}",
+            f"measured_TP={measured['input_tp']}",
+            f"measured_LRA={measured['input_lra']}",
+            f"measured_thresh={measured['input_thresh']}",
+            f"offset={measured['target_offset']}",
+            'linear=true',
+        ]
+    options.append('print_format=json')
+    return 'loudnorm=' + ':'.join(options)
+
+
+def _parse_loudnorm(stderr):
+    """Extrair o bloco JSON que o loudnorm imprime ao final"""
+    start = stderr.rfind('{')
+    end = stderr.rfind('}')
+    if start < 0 or end < start:
+        raise TranscodeError('medição de loudness não encontrada na saída do ffmpeg')
+    return json.loads(stderr[start:end + 1])
+
+
+def _parse_duration(stderr):
+    """Duração decodificada (último `time=` do progresso), em segundos"""
+    matches = _TIME_PATTERN.findall(stderr)
+    if not matches:
+        return None
+    hours, minutes, seconds = matches[-1]
+    return round(int(hours) * 3600 + int(minutes) * 60 + float(seconds), 3)
+
+
+def measure_loudness(src, loudness=DEFAULT_LOUDNESS, true_peak=DEFAULT_TRUE_PEAK,
+                     loudness_range=DEFAULT_LOUDNESS_RANGE):
+    """Primeira passada: medir loudness e duração sem gerar saída"""
+    stderr = _run_ffmpeg([
+        '-i', src, '-vn',
+        '-af', _loudnorm_filter(loudness, true_peak, loudness_range),
+        '-f', 'null', '-'
+    ])
+    measured = _parse_loudnorm(stderr)
+    measured['duration_seconds'] = _parse_duration(stderr)
+    return measured
+
+
+def transcode(src, dst, fmt=DEFAULT_FORMAT, bitrate=DEFAULT_BITRATE, loudness=DEFAULT_LOUDNESS,
+              true_peak=DEFAULT_TRUE_PEAK, loudness_range=DEFAULT_LOUDNESS_RANGE):
+    """Converter `src` em `dst` com a loudness normalizada
+
+    O arquivo é escrito em um temporário e renomeado ao final, então uma
+    execução interrompida nunca deixa uma saída incompleta. Retorna a
+    duração (s) e a loudness medida do original.
+    """
+    _, codec_args, sample_rate = TRANSCODE_FORMATS[fmt]
+    measured = measure_loudness(src, loudness, true_peak, loudness_range)
+
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst) or '.', suffix=os.path.splitext(dst)[1])
+    os.close(fd)
+    try:
+        _run_ffmpeg([
+            '-y', '-nostats', '-i', src, '-vn', '-map_metadata', '-1',
+            '-af', _loudnorm_filter(loudness, true_peak, loudness_range, measured),
+            '-ar', str(sample_rate), *codec_args, '-b:a', bitrate, tmp_path
+        ])
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return {
+        'duration_seconds': measured['duration_seconds'],
+        'source_loudness': float(measured['input_i']),
+    }
+
+
+def settings_id(fmt=DEFAULT_FORMAT, bitrate=DEFAULT_BITRATE, loudness=DEFAULT_LOUDNESS,
+                true_peak=DEFAULT_TRUE_PEAK, loudness_range=DEFAULT_LOUDNESS_RANGE):
+    """Identificador curto da configuração (nome da pasta dos arquivos gerados)"""
+    raw = f"{fmt}/{bitrate}/{loudness}/{true_peak}/{loudness_range}"
+    return f"{fmt}-{bitrate}-{hashlib.sha256(raw.encode()).hexdigest()[:8]}"
+
+
+class Transcoder:
+    """Converte os clipes para uma pasta de saída, reaproveitando os já convertidos"""
+
+    def __init__(self, fmt=DEFAULT_FORMAT, bitrate=DEFAULT_BITRATE, loudness=DEFAULT_LOUDNESS,
+                 output_dir=DEFAULT_TRANSCODE_DIR, workers=None):
+        if fmt not in TRANSCODE_FORMATS:
+            raise ValueError(f"formato desconhecido: {fmt} (use {', '.join(TRANSCODE_FORMATS)})")
+        self.fmt = fmt
+        self.bitrate = bitrate
+        self.loudness = loudness
+        self.extension = TRANSCODE_FORMATS[fmt][0]
+        self.output_dir = os.path.join(output_dir, settings_id(fmt, bitrate, loudness))
+        self.workers = workers or os.cpu_count() or 1
+
+    def output_path(self, category, file):
+        return os.path.join(self.output_dir, category, os.path.splitext(file)[0] + self.extension)
+
+    def _info_path(self, dst):
+        return dst + '.json'
+
+    def convert(self, src, category, file):
+        """Retornar (caminho convertido, informações), convertendo só se necessário"""
+        dst = self.output_path(category, file)
+        info_path = self._info_path(dst)
+        try:
+            if os.stat(dst).st_mtime_ns >= os.stat(src).st_mtime_ns:
+                with open(info_path, encoding='utf-8') as f:
+                    return dst, json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+
+        info = transcode(src, dst, self.fmt, self.bitrate, self.loudness)
+        info.update({'format': self.fmt, 'bitrate': self.bitrate, 'target_loudness': self.loudness})
+        with open(info_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        return dst, info
+
+    def convert_many(self, jobs):
+        """Converter em paralelo; `jobs` é uma lista de (original, categoria, nome)
+
+        Retorna uma lista na mesma ordem com (caminho, informações) ou a exceção.
+        """
+        def run(job):
+            try:
+                return self.convert(*job)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='transcode') as executor:
+            return list(executor.map(run, jobs))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + TRANSCODE_FORMATS[DEFAULT_FORMAT][0]
+    fmt = next((name for name, (ext, _, _) in TRANSCODE_FORMATS.items() if target.endswith(ext)), DEFAULT_FORMAT)
+    result = transcode(source, target, fmt)
+    print(f"✅ {source} -> {target} ({result['duration_seconds']}s, loudness original {result['source_loudness']} LUFS)")
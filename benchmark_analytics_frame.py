@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: DataFrame de objetos (atual) vs. DataFrame tipado (analytics_frame)
+
+Gera avaliações sintéticas com a mesma forma dos documentos do Firestore,
+grava em um SQLite temporário e compara, para cada tamanho:
+
+- object: `pd.DataFrame(avaliações)` / `pd.read_sql_query` sem esquema
+- typed: `frame_from_records` / `read_frame` (categóricas, int8, datetime64)
+
+São medidos o tempo de montagem, a memória (memory_usage deep), o tempo de
+uma ida e volta por pickle (o que o `st.cache_data` faz a cada leitura do
+cache) e o tempo das operações que o painel faz: médias por categoria e por
+arquivo, contagem por nota e filtro `isin` por categorias.
+
+Uso: python benchmark_analytics_frame.py --rows 100000 1000000
+"""
+
+import os
+import time
+import pickle
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from analytics_frame import COLUMNS, frame_from_records, read_frame
+
+CATEGORIES = ("library", "no-enhancement", "with-enhancement-10", "with-enhancement-30", "synthesized", "new_synthesized")
+USER_AGENTS = tuple(f"Mozilla/5.0 (Navegador {i}) AppleWebKit/537.36 (KHTML, like Gecko)" for i in range(40))
+
+
+def make_records(n_rows, n_files, seed):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    records = []
+    for i in range(n_rows):
+        file_index = rng.randrange(n_files)
+        session = f"{rng.getrandbits(64):016x}" if i % 20 == 0 else records[-1]["session_id"]
+        records.append({
+            "anonymous_id": f"audio_{file_index:016x}",
+            "original_filename": f"pingocast_{file_index:05d}.wav",
+            "score": rng.randint(1, 5),
+            "category": CATEGORIES[file_index % len(CATEGORIES)],
+            "duration": "curto" if file_index % 2 else "longo",
+            "session_id": session,
+            "timestamp": start + timedelta(seconds=i),
+            "user_agent": USER_AGENTS[rng.randrange(len(USER_AGENTS))],
+        })
+    return records
+
+
+def write_sqlite(path, records):
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE evaluations ({', '.join(COLUMNS)})")
+    conn.executemany(
+        f"INSERT INTO evaluations VALUES ({', '.join('?' * len(COLUMNS))})",
+        ([r[c] if c != "timestamp" else r[c].timestamp() for c in COLUMNS] for r in records)
+    )
+    conn.commit()
+    return conn
+
+
+def timed(function, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def workload(df):
+    selected = ["with-enhancement-10", "synthesized"]
+    return {
+        "cópia do cache": lambda: pickle.loads(pickle.dumps(df)),
+        "groupby category": lambda: df.groupby("category", observed=True)["score"].mean(),
+        "groupby file": lambda: df.groupby("original_filename", observed=True)["score"].agg(["mean", "count", "std"]),
+        "value_counts score": lambda: df["score"].value_counts(),
+        "isin categories": lambda: df[df["category"].isin(selected)],
+    }
+
+
+def run(n_rows, n_files, seed):
+    records = make_records(n_rows, n_files, seed)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM evaluations"
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = write_sqlite(os.path.join(directory, "evaluations.sqlite3"), records)
+        loaders = {
+            "object": {
+                "records": lambda: pd.DataFrame(records),
+                "sqlite": lambda: pd.read_sql_query(sql, conn),
+            },
+            "typed": {
+                "records": lambda: frame_from_records(records),
+                "sqlite": lambda: read_frame(conn, sql),
+            },
+        }
+
+        print(f"\n{n_rows:,} avaliações, {n_files} arquivos")
+        print(f"{'frame':>7} {'operação':>20} {'tempo (ms)':>11}")
+        memory = {}
+        for name, sources in loaders.items():
+            for source, loader in sources.items():
+                seconds, df = timed(loader, repeat=1)
+                print(f"{name:>7} {'montar de ' + source:>20} {seconds * 1000:>11.1f}")
+            memory[name] = df.memory_usage(deep=True).sum()
+            for operation, function in workload(df).items():
+                seconds, _ = timed(function)
+                print(f"{name:>7} {operation:>20} {seconds * 1000:>11.1f}")
+        conn.close()
+
+    for name, size in memory.items():
+        print(f"memória {name}: {size / 2 ** 20:.1f} MiB")
+    print(f"redução: {memory['object'] / memory['typed']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        run(n_rows, args.files, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latência e qualidade da análise estatística (analytics_stats)
+
+Gera votos sintéticos com qualidade real por voz, avaliadores (sessões) com
+viés próprio (alguns severos, outros generosos) e vozes com quantidades de
+votos bem diferentes, e mede:
+
+- o tempo do bootstrap por arquivo e categoria, dos z-scores por sessão e do
+  ranking voz + avaliador, contra uma meta de latência para uso interativo;
+- o erro (RMSE) e a correlação de postos (Spearman) com a qualidade real da
+  média bruta e da média ajustada pelo modelo.
+
+Uso: python benchmark_analytics_stats.py --rows 1000000 --target 2.0
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from analytics_aggregates import build_aggregates, GROUPS
+from analytics_stats import group_ci, normalized_means, rank_voices, session_zscores
+
+CATEGORIES = ("library", "no-enhancement", "with-enhancement-10", "with-enhancement-30", "synthesized", "new_synthesized")
+
+
+def make_votes(n_rows, n_files, session_length, seed):
+    rng = np.random.default_rng(seed)
+    quality = rng.uniform(2.0, 4.3, n_files)
+    # Popularidade desigual: algumas vozes recebem muito mais votos
+    popularity = rng.zipf(1.6, n_files).astype(float)
+    popularity /= popularity.sum()
+
+    n_sessions = max(1, n_rows // session_length)
+    bias = rng.normal(0, 0.6, n_sessions)
+    sessions = np.sort(rng.integers(0, n_sessions, n_rows))
+    files = rng.choice(n_files, n_rows, p=popularity)
+    # Metade dos votos das sessões severas vai para a primeira metade das vozes
+    # (e das generosas para a segunda), o que distorce a média bruta
+    steered = rng.random(n_rows) < 0.5
+    half = rng.integers(0, n_files // 2, n_rows) + np.where(bias[sessions] < 0, 0, n_files // 2)
+    files = np.where(steered, half, files)
+    scores = np.clip(np.rint(quality[files] + bias[sessions] + rng.normal(0, 0.7, n_rows)), 1, 5).astype(np.int8)
+
+    names = np.array([f"pingocast_{i:05d}.wav" for i in range(n_files)])
+    session_ids = np.array([f"{i:016x}" for i in range(n_sessions)])
+    categories = np.array(CATEGORIES)[np.arange(n_files) % len(CATEGORIES)]
+    frame = pd.DataFrame({
+        "original_filename": pd.Categorical.from_codes(files, names),
+        "score": scores,
+        "category": pd.Categorical(categories[files]),
+        "duration": pd.Categorical(np.where(files % 2, "curto", "longo")),
+        "session_id": pd.Categorical.from_codes(sessions, session_ids),
+        "timestamp": pd.to_datetime(np.arange(n_rows), unit="s", utc=True),
+    })
+    frame["anonymous_id"] = frame["original_filename"]
+    return frame, pd.Series(quality, index=names)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def spearman(a, b):
+    return pd.Series(a).rank().corr(pd.Series(b).rank())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--session-length", type=int, default=20)
+    parser.add_argument("--bootstrap", type=int, default=2000)
+    parser.add_argument("--target", type=float, default=2.0, help="meta de latência total (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    frame, quality = make_votes(args.rows, args.files, args.session_length, args.seed)
+    print(f"{args.rows:,} votos, {args.files} vozes, {frame['session_id'].nunique():,} sessões\n")
+
+    aggregates = {name: {k: s.summary() for k, s in groups.items()}
+                  for name, groups in build_aggregates(frame).items() if name in GROUPS}
+    steps = {
+        "bootstrap arquivos": lambda: group_ci(aggregates, "files", args.bootstrap),
+        "bootstrap categorias": lambda: group_ci(aggregates, "categories", args.bootstrap),
+        "z-scores por sessão": lambda: session_zscores(frame),
+        "médias normalizadas": lambda: normalized_means(frame),
+        "ranking voz+avaliador": lambda: rank_voices(frame),
+    }
+    results, total = {}, 0.0
+    for name, step in steps.items():
+        seconds, results[name] = timed(step)
+        total += seconds
+        print(f"{name:>22} {seconds * 1000:>9.1f} ms")
+    status = "OK" if total <= args.target else "ACIMA DA META"
+    print(f"{'total':>22} {total * 1000:>9.1f} ms (meta {args.target * 1000:.0f} ms: {status})\n")
+
+    ranking = results["ranking voz+avaliador"]
+    truth = quality.reindex(ranking.index)
+    for label, estimate in (("média bruta", ranking["mean"]), ("média ajustada", ranking["adjusted_mean"])):
+        rmse = float(np.sqrt(np.mean((estimate - truth) ** 2)))
+        print(f"{label:>15}: RMSE {rmse:.3f}, Spearman {spearman(estimate, truth):.3f}")
+
+    ci = results["bootstrap arquivos"]
+    covered = ((ci["ci_low"] <= quality.reindex(ci.index)) & (quality.reindex(ci.index) <= ci["ci_high"])).mean()
+    print(f"IC 95% por arquivo: meia-largura mediana {((ci['ci_high'] - ci['ci_low']) / 2).median():.3f}, "
+          f"cobre a qualidade real em {covered:.0%} (o IC da média bruta não corrige o viés dos avaliadores)")
+
+
+if __name__ == "__main__":
+    main()
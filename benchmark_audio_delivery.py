@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memória do servidor por sessão concorrente nos modos de entrega
+
+Simula N sessões abrindo o mesmo áudio ao mesmo tempo. No modo "proxy" cada
+sessão baixa os bytes (como o download_audio_from_s3) e recebe uma cópia
+despicklada (como o st.cache_data faz). No modo "url" a sessão só recebe a
+URL pré-assinada. No modo "stream" a sessão recebe a URL assinada de um
+AudioStreamServer rodando no mesmo processo (como no app), que entrega o
+clipe do cache em disco; cada sessão toca o áudio com pedidos Range (início e
+um salto para o meio), e a memória do servidor entra na medição.
+Um servidor HTTP local faz o papel do S3.
+
+Uso: python benchmark_audio_delivery.py --sessions 50 --clip-mb 8
+"""
+
+import gc
+import time
+import pickle
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from audio_cache import DiskAudioCache
+from audio_delivery import DELIVERY_STREAM, DELIVERY_MODES, resolve_audio_source
+from audio_stream_server import CHUNK_SIZE, AudioStreamServer, stream_url
+
+STREAM_SECRET = "benchmark"
+BUCKET, KEY, ETAG = "benchmark", "clip.wav", "benchmark"
+
+
+def make_handler(payload):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/wav")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def play(url, size):
+    """Tocar como o `<audio>` do navegador: pedido a partir do início e um salto para o meio
+
+    Os bytes recebidos são descartados; só o servidor guarda memória.
+    """
+    for start in (0, size // 2):
+        with requests.get(url, headers={"Range": f"bytes={start}-"}, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            for _ in response.iter_content(CHUNK_SIZE):
+                pass
+
+
+def run_mode(mode, url, stream_base, size, sessions):
+    """Executar N sessões concorrentes e retornar o pico de memória (bytes) e o tempo total (s)"""
+    held = [None] * sessions
+
+    def download():
+        response = requests.get(url, timeout=30)
+        # st.cache_data devolve uma cópia despicklada a cada chamada
+        return pickle.loads(pickle.dumps(response.content))
+
+    def stream():
+        return stream_url(stream_base, STREAM_SECRET, BUCKET, KEY, ETAG)
+
+    def session(i):
+        held[i] = resolve_audio_source(mode, lambda: url, download, stream=stream)
+        if mode == DELIVERY_STREAM:
+            play(held[i], size)
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--clip-mb", type=float, default=8.0)
+    args = parser.parse_args()
+
+    payload = b"\0" * int(args.clip_mb * 1024 * 1024)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(payload))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/clip.wav"
+
+    # Servidor de streaming em uma porta livre, com o clipe já no cache em disco
+    cache_dir = tempfile.mkdtemp(prefix="benchmark-audio-cache-")
+    cache = DiskAudioCache(cache_dir)
+    cache.put(BUCKET, KEY, ETAG, payload)
+    stream_server = AudioStreamServer(None, cache, STREAM_SECRET, host="127.0.0.1", port=0).start()
+    stream_base = f"http://127.0.0.1:{stream_server.server_address[1]}"
+
+    print(f"{args.sessions} sessões concorrentes, áudio de {args.clip_mb:.1f} MB")
+    try:
+        for mode in DELIVERY_MODES:
+            peak, elapsed = run_mode(mode, url, stream_base, len(payload), args.sessions)
+            print(f"  {mode:>6}: pico {peak / 1024 / 1024:9.2f} MB  "
+                  f"({peak / args.sessions / 1024:10.1f} KB por sessão)  {elapsed:6.2f}s")
+    finally:
+        stream_server.stop()
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
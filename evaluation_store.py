@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Cópia local (SQLite) das avaliações para o painel de análise
+
+Em vez de ler a coleção inteira do Firestore a cada atualização, o painel
+guarda as avaliações em um SQLite local e busca apenas os documentos com
+`updated_at` maior ou igual à marca d'água (o maior `updated_at` já
+sincronizado). `updated_at` é o horário do servidor do Firestore gravado pelo
+vote_writer a cada escrita, e não o `timestamp` do voto (relógio do cliente):
+votos reenviados pelo log local ou que esperaram na fila chegam com um
+`timestamp` antigo, mas com um `updated_at` novo. Como um novo voto da mesma
+sessão sobrescreve o documento `{session_id}_{audio_id}`, ele também é
+buscado e substitui a linha local pela chave do documento. Cada mudança incrementa a
+versão dos dados, usada como chave dos caches do painel.
+
+Documentos apagados com `updated_at` abaixo da marca não aparecem na
+consulta. Quem apaga um documento e grava outro no lugar (ex.:
+migrate_audio_ids) lista os IDs apagados no campo `replaces` do novo
+documento, e as linhas locais correspondentes são removidas quando ele chega.
+
+No painel, a cópia é mantida em tempo real pelo EvaluationListener (um
+on_snapshot por processo); a sincronização por consulta fica como fallback.
+
+Uso: python evaluation_store.py resync   # descarta a cópia local e baixa tudo de novo
+"""
+
+import os
+import sys
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from analytics_frame import COLUMNS, read_frame
+
+DEFAULT_SNAPSHOT_PATH = os.path.join("data", "evaluations.sqlite3")
+
+# Horário do servidor gravado pelo vote_writer em cada escrita (ver firestore_commit)
+UPDATED_AT = "updated_at"
+# A marca d'água antiga ("high_water_mark") era pelo `timestamp` do voto; com a chave
+# nova, cópias locais existentes fazem uma sincronização completa uma única vez
+HIGH_WATER_MARK_KEY = "updated_at_high_water_mark"
+# IDs de documentos apagados que este documento substitui (ver migrate_audio_ids)
+REPLACES = "replaces"
+
+
+def to_epoch(value):
+    """Converter o timestamp do Firestore para segundos (UTC)"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+class Changes(list):
+    """Mudanças aplicadas [(doc_id, linha antiga, linha nova)], com a versão
+    da cópia local antes e depois delas (None quando nada mudou)"""
+
+    def __init__(self, items=(), before=None, after=None):
+        super().__init__(items)
+        self.before = before
+        self.after = after
+
+
+class EvaluationStore:
+    """Avaliações sincronizadas incrementalmente do Firestore para SQLite"""
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS evaluations (
+                doc_id TEXT PRIMARY KEY,
+                anonymous_id TEXT,
+                original_filename TEXT,
+                score INTEGER,
+                category TEXT,
+                duration TEXT,
+                session_id TEXT,
+                timestamp REAL,
+                user_agent TEXT
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+        # Paginação por data e filtros da tabela do painel (ver analytics_table)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS evaluations_timestamp ON evaluations (timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS evaluations_session ON evaluations (session_id, timestamp)")
+        self._conn.commit()
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def high_water_mark(self):
+        """Maior `updated_at` (segundos UTC) já sincronizado, ou None"""
+        with self._lock:
+            return self._meta(HIGH_WATER_MARK_KEY)
+
+    def version(self):
+        """Versão dos dados locais (incrementa a cada sincronização com mudanças)"""
+        with self._lock:
+            return int(self._meta("version") or 0)
+
+    def _row(self, data):
+        row = {column: data.get(column) for column in COLUMNS}
+        row["timestamp"] = to_epoch(data.get("timestamp"))
+        return row
+
+    def _fetch(self, doc_ids):
+        rows = {}
+        doc_ids = list(doc_ids)
+        # Limite de parâmetros por consulta no SQLite
+        for start in range(0, len(doc_ids), 500):
+            chunk = doc_ids[start:start + 500]
+            cursor = self._conn.execute(
+                f"SELECT doc_id, {', '.join(COLUMNS)} FROM evaluations WHERE doc_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for doc_id, *values in cursor:
+                rows[doc_id] = dict(zip(COLUMNS, values))
+        return rows
+
+    def apply_changes(self, changes):
+        """Aplicar documentos [(doc_id, dados ou None para remoção)]
+
+        Os documentos listados em `replaces` de um documento são removidos.
+        Retorna só o que mudou, como Changes [(doc_id, linha antiga ou None,
+        linha nova ou None)]. Documentos idênticos aos locais são ignorados e
+        não alteram a versão.
+        """
+        latest, updated = {}, []
+        for doc_id, data in changes:
+            for replaced_id in (data or {}).get(REPLACES) or ():
+                if replaced_id != doc_id:
+                    latest[replaced_id] = None
+            latest[doc_id] = None if data is None else self._row(data)
+            if data is not None and data.get(UPDATED_AT) is not None:
+                updated.append(to_epoch(data[UPDATED_AT]))
+        if not latest:
+            return Changes()
+
+        with self._lock:
+            old_rows = self._fetch(latest)
+            applied = []
+            for doc_id, new in latest.items():
+                old = old_rows.get(doc_id)
+                if old != new:
+                    applied.append((doc_id, old, new))
+
+            upserts = [[doc_id] + [new[column] for column in COLUMNS] for doc_id, _, new in applied if new]
+            deletes = [(doc_id,) for doc_id, _, new in applied if new is None]
+            placeholders = ", ".join("?" * (len(COLUMNS) + 1))
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO evaluations (doc_id, {', '.join(COLUMNS)}) VALUES ({placeholders})",
+                upserts
+            )
+            self._conn.executemany("DELETE FROM evaluations WHERE doc_id = ?", deletes)
+
+            if updated:
+                self._set_meta(HIGH_WATER_MARK_KEY, max(max(updated), self._meta(HIGH_WATER_MARK_KEY) or 0))
+            before = after = None
+            if applied:
+                before = int(self._meta("version") or 0)
+                after = before + 1
+                self._set_meta("version", after)
+            self._conn.commit()
+        return Changes(applied, before, after)
+
+    def sync(self, db, collection):
+        """Buscar no Firestore só os documentos a partir da marca d'água; retorna as mudanças"""
+        query = db.collection(collection)
+        high_water_mark = self.high_water_mark()
+        if high_water_mark is not None:
+            # ">=" para não perder documentos com o mesmo horário da marca; a gravação é idempotente
+            since = datetime.fromtimestamp(high_water_mark, tz=timezone.utc)
+            query = query.where(UPDATED_AT, ">=", since).order_by(UPDATED_AT)
+
+        return self.apply_changes((doc.id, doc.to_dict()) for doc in query.stream())
+
+    def rows(self):
+        """Todas as linhas locais como (doc_id, linha)"""
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT doc_id, {', '.join(COLUMNS)} FROM evaluations")
+            return [(doc_id, dict(zip(COLUMNS, values))) for doc_id, *values in cursor]
+
+    def count(self, where="1", params=()):
+        """Quantidade de avaliações que satisfazem a condição SQL `where`"""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM evaluations WHERE {where}", params).fetchone()[0]
+
+    def select(self, where="1", params=(), limit=100, offset=0):
+        """Página de avaliações (mais recentes primeiro) como DataFrame tipado"""
+        with self._lock:
+            return read_frame(
+                self._conn,
+                f"SELECT {', '.join(COLUMNS)} FROM evaluations WHERE {where} "
+                "ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                tuple(params) + (limit, offset)
+            )
+
+    def recent_by_score(self, limit):
+        """Últimos `limit` votos de cada nota, {nota: [(doc_id, anonymous_id, category), ...]} do mais antigo ao mais novo"""
+        recent = {}
+        with self._lock:
+            scores = [row[0] for row in self._conn.execute("SELECT DISTINCT score FROM evaluations")]
+            for score in scores:
+                rows = self._conn.execute(
+                    "SELECT doc_id, anonymous_id, category FROM evaluations WHERE score = ? "
+                    "ORDER BY timestamp DESC LIMIT ?",
+                    (score, limit)
+                ).fetchall()
+                recent[score] = rows[::-1]
+        return recent
+
+    @contextmanager
+    def read_snapshot(self):
+        """Conexão somente leitura em uma transação: uma visão consistente dos dados
+        (e da versão) enquanto o listener continua gravando (WAL)"""
+        conn = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, timeout=30)
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        finally:
+            conn.close()
+
+    def reset(self):
+        """Apagar a cópia local (a próxima sincronização baixa tudo de novo)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM evaluations")
+            self._conn.execute("DELETE FROM meta WHERE key = ?", (HIGH_WATER_MARK_KEY,))
+            self._set_meta("version", (self._meta("version") or 0) + 1)
+            self._conn.commit()
+
+    def to_frame(self):
+        """Todas as avaliações locais como DataFrame tipado (ver analytics_frame)"""
+        with self._lock:
+            return read_frame(self._conn, f"SELECT {', '.join(COLUMNS)} FROM evaluations")
+
+    def versioned_frame(self):
+        """(versão, DataFrame) lidos juntos, sem escritas deste processo no meio"""
+        with self._lock:
+            version = int(self._meta("version") or 0)
+            return version, read_frame(self._conn, f"SELECT {', '.join(COLUMNS)} FROM evaluations")
+
+
+class EvaluationListener:
+    """Escuta as mudanças da coleção no Firestore (on_snapshot) e as aplica na cópia local
+
+    A consulta começa na marca d'água, então o snapshot inicial só traz o que
+    ainda não foi sincronizado. Cada lote de mudanças é gravado no SQLite e o
+    que mudou de fato é repassado a `on_changes` (ex.: os agregados do painel).
+    Depois de `restart_after` mudanças a escuta é reiniciada a partir da nova
+    marca, para que o cliente não acumule todos os documentos em memória.
+    """
+
+    def __init__(self, db, collection, store, on_changes, restart_after=50000):
+        self._db = db
+        self._collection = collection
+        self._store = store
+        self._on_changes = on_changes
+        self._restart_after = restart_after
+        self._lock = threading.Lock()
+        self._watch = None
+        self._received = 0
+        self.last_error = None
+
+    def start(self):
+        """Iniciar (ou reiniciar) a escuta a partir da marca d'água atual"""
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+            query = self._db.collection(self._collection)
+            high_water_mark = self._store.high_water_mark()
+            if high_water_mark is not None:
+                since = datetime.fromtimestamp(high_water_mark, tz=timezone.utc)
+                query = query.where(UPDATED_AT, ">=", since)
+            self._received = 0
+            self._watch = query.on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        try:
+            batch = [
+                (change.document.id, None if change.type.name == "REMOVED" else change.document.to_dict())
+                for change in changes
+            ]
+            self._on_changes(self._store.apply_changes(batch))
+            self._received += len(batch)
+        except Exception as e:
+            self.last_error = e
+
+    @property
+    def running(self):
+        return self._watch is not None and self._watch.is_active
+
+    def ensure_running(self):
+        """Reiniciar a escuta se ela caiu ou já acumulou mudanças demais"""
+        if not self.running or self._received >= self._restart_after:
+            self.start()
+        return self.running
+
+    def stop(self):
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from vote_log import init_firestore_from_env
+
+    load_dotenv()
+    store = EvaluationStore(os.getenv("EVALUATIONS_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH))
+    if len(sys.argv) > 1 and sys.argv[1] == "resync":
+        store.reset()
+
+    db = init_firestore_from_env()
+    changed = store.sync(db, os.getenv("FIREBASE_DB_NAME", "evaluations"))
+    print(f"✅ {len(changed)} avaliações sincronizadas em {store.path} (versão {store.version()})")
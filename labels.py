@@ -0,0 +1,84 @@
+"""
+Rótulos de exibição compartilhados pela aplicação e pelo painel
+
+Nomes das notas, das categorias e das durações ficam definidos só aqui e as
+tabelas derivadas (rótulos com número, com estrelas, botões) são montadas uma
+vez na importação. Categorias novas no S3 recebem um rótulo derivado do nome
+da pasta (ex.: "new_voice-v3" -> "New voice v3") sem precisar editar código;
+rótulos específicos podem ser dados em JSON pela variável CATEGORY_LABELS_JSON.
+
+`relabel` troca os rótulos de uma coluna inteira de uma vez: a função de
+rótulo roda uma vez por valor distinto (as categorias) e não por linha.
+"""
+
+import os
+import json
+from functools import lru_cache
+
+import pandas as pd
+
+SCORE_NAMES = {
+    1: "Muito Inadequada",
+    2: "Inadequada",
+    3: "Razoável",
+    4: "Boa",
+    5: "Excelente",
+}
+SCORE_EMOJIS = {1: "❌", 2: "👎", 3: "😐", 4: "👍", 5: "⭐"}
+
+# "3 - Razoável" (gráficos e botões) e "3 ⭐⭐⭐ - Razoável" (tabelas)
+SCORE_LABELS = {score: f"{score} - {name}" for score, name in SCORE_NAMES.items()}
+SCORE_STAR_LABELS = {score: f"{score} {'⭐' * score} - {name}" for score, name in SCORE_NAMES.items()}
+
+# (rótulo, emoji, nota) na ordem dos botões de avaliação
+SCORE_BUTTONS = tuple((SCORE_LABELS[score], SCORE_EMOJIS[score], score) for score in SCORE_NAMES)
+
+CATEGORY_LABELS = {
+    "with-enhancement-10": "Luciane - SE 10%",
+    "with-enhancement-30": "Luciane - SE 30%",
+    "no-enhancement": "Luciane",
+    "synthesized": "Voz Sintética - v1",
+    "new_synthesized": "Voz Sintética - v2",
+    "library": "Biblioteca - ElevenLabs",
+}
+CATEGORY_LABELS.update(json.loads(os.getenv("CATEGORY_LABELS_JSON") or "{}"))
+
+DURATION_LABELS = {"curto": "Curto", "longo": "Longo"}
+
+
+@lru_cache(maxsize=None)
+def category_label(category):
+    """Rótulo de exibição da categoria (derivado do nome se não estiver cadastrada)"""
+    if category is None:
+        return "Sem categoria"
+    label = CATEGORY_LABELS.get(category)
+    if label is None:
+        name = " ".join(str(category).replace("_", " ").replace("-", " ").split())
+        label = name[:1].upper() + name[1:]
+    return label
+
+
+def category_labels(categories):
+    """{categoria: rótulo} para as categorias dadas"""
+    return {category: category_label(category) for category in categories}
+
+
+def duration_label(duration):
+    return DURATION_LABELS.get(duration, duration)
+
+
+def relabel(values, label):
+    """Aplicar `label` a cada valor distinto e retornar uma categórica com os rótulos
+
+    Valores ausentes continuam ausentes. Se dois valores tiverem o mesmo
+    rótulo, eles passam a compartilhar a mesma categoria.
+    """
+    categorical = pd.Categorical(values)
+    names = pd.Index([label(value) for value in categorical.categories])
+    if names.is_unique:
+        result = pd.Categorical.from_codes(categorical.codes, names)
+    else:
+        result = pd.Categorical(names.take(categorical.codes).where(categorical.codes >= 0))
+    if isinstance(values, pd.Series):
+        return pd.Series(result, index=values.index, name=values.name)
+    return result
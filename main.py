@@ -1,9 +1,8 @@
 import os
 import json
 import base64
-import random
+import sqlite3
 import hashlib
-import requests
 from datetime import datetime
 
 import boto3
@@ -11,6 +10,19 @@ import firebase_admin
 import streamlit as st
 from firebase_admin import credentials, firestore
 
+from audio_cache import DEFAULT_CACHE_DIR, DiskAudioCache
+from audio_catalog import DEFAULT_CATALOG_CACHE_DIR, AudioCatalog, content_type_for
+from audio_delivery import DELIVERY_PROXY, DELIVERY_STREAM, resolve_delivery_mode, resolve_audio_source
+from audio_http import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_SIZE, DEFAULT_READ_TIMEOUT, DEFAULT_RETRIES,
+                        S3AudioReader, s3_config)
+from audio_prefetch import AudioPrefetcher
+from audio_stream_server import DEFAULT_STREAM_PORT, AudioStreamServer, stream_url
+from labels import SCORE_BUTTONS
+from playlist import DESIGN_RANDOM, build_playlist, session_seed
+from scheduler import AdaptiveScheduler
+from vote_log import DEFAULT_LOG_PATH, VoteLog
+from vote_writer import BatchedVoteWriter, firestore_commit
+
 
 # Configuração inicial do Streamlit
 st.set_page_config(
@@ -278,7 +290,14 @@ def init_s3_client():
             "s3",
             region_name=st.secrets["AWS_REGION"],
             aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
-            aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"]
+            aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
+            # Pool de conexões compartilhado pelas threads, timeouts e retentativas
+            config=s3_config(
+                pool_size=int(st.secrets.get("AUDIO_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                connect_timeout=float(st.secrets.get("AUDIO_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+                read_timeout=float(st.secrets.get("AUDIO_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)),
+                retries=int(st.secrets.get("AUDIO_HTTP_RETRIES", DEFAULT_RETRIES))
+            )
         )
         return s3_client
     except Exception as e:
@@ -286,62 +305,76 @@ def init_s3_client():
         return None
 
 
-# Carregar e preparar arquivos de áudio do S3
-@st.cache_data
-def load_audio_files_from_s3():
-    """Carregar metadata dos arquivos de áudio do S3"""
+@st.cache_resource
+def init_audio_cache():
+    """Inicializar cache de áudio em disco (compartilhado entre processos)"""
+    return DiskAudioCache(
+        st.secrets.get("AUDIO_CACHE_DIR", DEFAULT_CACHE_DIR),
+        max_bytes=int(st.secrets.get("AUDIO_CACHE_MAX_MB", 1024)) * 1024 * 1024
+    )
+
+
+# Catálogo de áudios compartilhado, atualizado em segundo plano
+@st.cache_resource
+def init_audio_catalog():
+    """Carregar o catálogo (manifesto do S3, ou listagem se não houver) e iniciar a atualização"""
     s3_client = init_s3_client()
     if not s3_client:
-        return []
+        return None
 
-    bucket_name = st.secrets["AWS_S3_BUCKET"]
-    s3_prefix = st.secrets["S3_PREFIX"]
+    catalog = AudioCatalog(
+        s3_client,
+        st.secrets["AWS_S3_BUCKET"],
+        st.secrets["S3_PREFIX"],
+        cache_dir=st.secrets.get("CATALOG_CACHE_DIR", DEFAULT_CATALOG_CACHE_DIR)
+    )
+    catalog.start(float(st.secrets.get("CATALOG_REFRESH_SECONDS", 300)))
+    return catalog
 
-    # Lista arquivos diretamente do S3
-    audio_files = []
 
-    paginator = s3_client.get_paginator("list_objects_v2")
-    page_iterator = paginator.paginate(
-        Bucket=bucket_name,
-        Prefix=s3_prefix
-    )
+# Carregar arquivos de áudio do S3
+def load_audio_files_from_s3():
+    """Carregar metadata dos arquivos de áudio (lista ordenada pela chave S3)
+
+    A lista é compartilhada e nunca é alterada: atualizações do catálogo
+    publicam uma nova, sem mudar a das sessões em andamento.
+    """
+    catalog = init_audio_catalog()
+    if not catalog:
+        return []
+    return catalog.snapshot()
+
 
-    for page in page_iterator:
-        if "Contents" in page:
-            for obj in page["Contents"]:
-                key = obj["Key"]
+@st.cache_resource
+def init_scheduler():
+    """Inicializar o agendador adaptativo, aquecido com os votos do log local"""
+    scheduler = AdaptiveScheduler()
+    for vote in init_vote_log().latest_votes():
+        scheduler.record(vote["anonymous_id"], vote["category"], vote["score"])
+    return scheduler
 
-                # Ignorar o arquivo de metadata e diretórios
-                if key.endswith(".json") or key.endswith('/'):
-                    continue
 
-                # Verificar se é arquivo de áudio
-                if key.endswith((".wav", ".mp3", ".flac", ".m4a", ".ogg", ".opus")):
-                    # Extrair informações do caminho
-                    parts = key.replace(s3_prefix, '').split('/')
-                    category = parts[0] if len(parts) > 1 else 'raiz'
-                    filename = parts[-1]
+def build_session_playlist(audio_files, seed):
+    """Ordem dos áudios da sessão: catálogo inteiro, ou lista curta adaptativa
 
-                    # Determinar duração
-                    duration = 'longo' if 'pingocast' in filename.lower() else 'curto'
+    A lista adaptativa é usada se PLAYLIST_LENGTH > 0 (número de áudios) ou
+    PLAYLIST_MAX_SECONDS > 0 (soma das durações dos áudios da sessão).
+    """
+    design = st.secrets.get("PLAYLIST_DESIGN", DESIGN_RANDOM)
+    length = int(st.secrets.get("PLAYLIST_LENGTH", 0))
+    max_seconds = float(st.secrets.get("PLAYLIST_MAX_SECONDS", 0)) or None
+    if length <= 0 or length > len(audio_files):
+        length = len(audio_files)
+    if max_seconds is None and length >= len(audio_files):
+        return build_playlist(audio_files, seed, design)
 
-                    # Gerar ID anônimo
-                    hash_obj = hashlib.md5(filename.encode())
-                    anonymous_id = f"audio_{hash_obj.hexdigest()[:8]}_{len(audio_files)}"
+    chosen = init_scheduler().assign(audio_files, length, seed, max_seconds)
+    order = build_playlist([audio_files[i] for i in chosen], seed, design)
+    return [chosen[i] for i in order]
 
-                    audio_files.append({
-                        "anonymous_id": anonymous_id,
-                        "original_name": filename,
-                        "category": category,
-                        "duration": duration,
-                        "s3_key": key,
-                        "bucket": bucket_name,
-                        "content_type": 'audio/wav' if key.endswith('.wav') else 'audio/mpeg'
-                    })
 
-    # Embaralhar a lista
-    random.shuffle(audio_files)
-    return audio_files
+# Modo de entrega do áudio: "url" (navegador baixa direto do S3), "proxy" ou "stream" (servidor local com Range)
+AUDIO_DELIVERY_MODE = resolve_delivery_mode(st.secrets.get("AUDIO_DELIVERY_MODE"))
 
 
 # Função para obter URL pré-assinada do S3
@@ -356,37 +389,129 @@ def get_presigned_url(bucket, key):
         url = s3_client.generate_presigned_url(
             "get_object",
             Params={"Bucket": bucket, "Key": key},
-            ExpiresIn=3600  # URL válida por 1 hora
+            # Válida pelo dobro do cache, para que uma URL servida do cache
+            # ainda funcione enquanto o navegador reproduz o áudio
+            ExpiresIn=7200
         )
         return url
     except Exception as e:
         st.error(f"Erro ao gerar URL: {e}")
         return None
 
+
+@st.cache_resource
+def init_audio_reader():
+    """Leitura dos áudios do S3 para o cache (GetObject em blocos, sem URL pré-assinada)"""
+    return S3AudioReader(init_s3_client(), init_audio_cache())
+
+
+@st.cache_resource
+def init_audio_prefetcher():
+    """Inicializar pool de pré-carregamento de áudios (compartilhado entre sessões)"""
+    return AudioPrefetcher(
+        init_audio_reader().fetch,
+        max_workers=int(st.secrets.get("AUDIO_PREFETCH_WORKERS", 4))
+    )
+
+
 # Função para baixar áudio do S3
-@st.cache_data(ttl=3600)
-def download_audio_from_s3(bucket, key):
-    """Baixar arquivo de áudio do S3"""
-    url = get_presigned_url(bucket, key)
-    if not url:
+def download_audio_from_s3(bucket, key, etag=None):
+    """Baixar arquivo de áudio do S3, passando pelo cache em disco"""
+    if not init_s3_client():
         return None
 
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.content
-        else:
-            st.error(f"Erro ao baixar áudio: Status {response.status_code}")
-            return None
+        return bytes(init_audio_prefetcher().fetch(bucket, key, etag))
     except Exception as e:
         st.error(f"Erro ao baixar áudio: {e}")
         return None
 
 
+@st.cache_resource
+def init_stream_server():
+    """Iniciar o servidor de streaming com Range (modo "stream") e retornar o segredo das URLs
+
+    Um servidor por processo. Se a porta já estiver em uso por outro processo
+    do app na mesma máquina, as URLs são atendidas por ele, desde que o
+    segredo seja compartilhado (AUDIO_STREAM_SECRET). Retorna None se o
+    streaming não estiver disponível.
+    """
+    s3_client = init_s3_client()
+    if not s3_client:
+        return None
+
+    shared_secret = st.secrets.get("AUDIO_STREAM_SECRET")
+    secret = shared_secret or os.urandom(32).hex()
+    prefetcher = init_audio_prefetcher()
+    try:
+        AudioStreamServer(
+            s3_client,
+            init_audio_cache(),
+            secret,
+            port=int(st.secrets.get("AUDIO_STREAM_PORT", DEFAULT_STREAM_PORT)),
+            # Clipe fora do cache: serve do S3 e baixa o arquivo inteiro em segundo plano
+            on_miss=lambda bucket, key, etag: prefetcher.prefetch([(bucket, key, etag)])
+        ).start()
+    except OSError:
+        if not shared_secret:
+            return None
+    return secret
+
+
+def get_stream_url(bucket, key, etag=None):
+    """URL assinada do clipe no servidor de streaming, ou None"""
+    secret = init_stream_server()
+    if not secret:
+        return None
+    port = int(st.secrets.get("AUDIO_STREAM_PORT", DEFAULT_STREAM_PORT))
+    base_url = st.secrets.get("AUDIO_STREAM_PUBLIC_URL") or f"http://localhost:{port}"
+    return stream_url(base_url, secret, bucket, key, etag)
+
+
+def prefetch_audio_files(audio_files, playlist, index):
+    """Pré-carregar os próximos áudios da lista e o anterior (botão "Anterior")"""
+    count = int(st.secrets.get("AUDIO_PREFETCH_COUNT", 3))
+    neighbors = [audio_files[i] for i in playlist[index + 1:index + 1 + count]]
+    if index > 0:
+        neighbors.append(audio_files[playlist[index - 1]])
+
+    init_audio_prefetcher().prefetch([
+        (audio.get("bucket", st.secrets["AWS_S3_BUCKET"]), audio["s3_key"], audio.get("etag"))
+        for audio in neighbors
+    ])
+
+
+@st.cache_resource
+def init_vote_log():
+    """Inicializar log local de votos (write-ahead log)"""
+    vote_log = VoteLog(st.secrets.get("VOTE_LOG_PATH", DEFAULT_LOG_PATH))
+    vote_log.compact()
+    return vote_log
+
+
+@st.cache_resource
+def init_vote_writer(_db):
+    """Inicializar fila de gravação em lote das avaliações (uma por processo)"""
+    vote_log = init_vote_log()
+    writer = BatchedVoteWriter(
+        firestore_commit(_db, st.secrets["FIREBASE_DB_NAME"]),
+        max_batch=int(st.secrets.get("VOTE_BATCH_SIZE", 50)),
+        max_delay=float(st.secrets.get("VOTE_BATCH_SECONDS", 1.0)),
+        on_written=vote_log.mark_flushed
+    )
+
+    # Reenviar votos que ficaram pendentes de execuções anteriores
+    for doc_id, data, seqs in vote_log.pending():
+        writer.submit(doc_id, data, tokens=seqs)
+
+    return writer
+
+
 # Salvar avaliação no Firebase
 def save_evaluation(db, audio_id, original_name, score, category, duration, session_id):
-    doc_ref = db.collection(st.secrets["FIREBASE_DB_NAME"]).document(f"{session_id}_{audio_id}")
-    doc_ref.set({
+    """Gravar o voto no log local e enfileirá-lo para o Firestore (sem bloquear a interface)"""
+    doc_id = f"{session_id}_{audio_id}"
+    data = {
         "anonymous_id": audio_id,
         "original_filename": original_name,
         "score": score,
@@ -395,7 +520,15 @@ def save_evaluation(db, audio_id, original_name, score, category, duration, sess
         "session_id": session_id,
         "timestamp": datetime.now(),
         "user_agent": st.session_state.get('user_agent', 'unknown')
-    })
+    }
+
+    try:
+        seq = init_vote_log().append(doc_id, data)
+    except sqlite3.Error:
+        # Sem o log o voto ainda segue pela fila para o Firestore
+        seq = None
+
+    init_vote_writer(db).submit(doc_id, data, tokens=() if seq is None else (seq,))
 
 # Inicializar estado da sessão
 if "current_index" not in st.session_state:
@@ -403,8 +536,16 @@ if "current_index" not in st.session_state:
     st.session_state.evaluations = {}
     st.session_state.session_id = hashlib.md5(str(datetime.now()).encode()).hexdigest()[:16]
 
-# Carregar arquivos de áudio
-audio_files = load_audio_files_from_s3()
+# Carregar arquivos de áudio e gerar a ordem da sessão (reproduzível pela semente)
+if "audio_files" not in st.session_state:
+    st.session_state.audio_files = load_audio_files_from_s3()
+    st.session_state.playlist_seed = session_seed(st.session_state.session_id)
+    st.session_state.playlist = build_session_playlist(
+        st.session_state.audio_files,
+        st.session_state.playlist_seed
+    )
+audio_files = st.session_state.audio_files
+playlist = st.session_state.playlist
 
 # Inicializar Firebase
 db = init_firebase()
@@ -421,13 +562,13 @@ st.markdown(
 )
 
 # Barra de progresso
-progress = (st.session_state.current_index / len(audio_files)) * 100 if len(audio_files) > 0 else 0
+progress = (st.session_state.current_index / len(playlist)) * 100 if len(playlist) > 0 else 0
 evaluated_count = len(st.session_state.evaluations)
 st.markdown(
     f"""
         <div class="progress-container">
             <div class="progress-bar" style="width: {progress}%;">
-                {st.session_state.current_index} / {len(audio_files)} ({evaluated_count} avaliados)
+                {st.session_state.current_index} / {len(playlist)} ({evaluated_count} avaliados)
             </div>
         </div>
     """,
@@ -435,8 +576,8 @@ st.markdown(
 )
 
 # Interface principal de avaliação
-if st.session_state.current_index < len(audio_files):
-    current_audio = audio_files[st.session_state.current_index]
+if st.session_state.current_index < len(playlist):
+    current_audio = audio_files[playlist[st.session_state.current_index]]
 
      # Diretrizes de avaliação
     st.markdown("""
@@ -491,17 +632,24 @@ if st.session_state.current_index < len(audio_files):
 
    # Card do áudio com título
     st.markdown(f"""
-    <h3 style='text-align: center; margin-bottom: 1.5rem;'>🎧 Ouça o Áudio {st.session_state.current_index + 1} de {len(audio_files)}</h3>
+    <h3 style='text-align: center; margin-bottom: 1.5rem;'>🎧 Ouça o Áudio {st.session_state.current_index + 1} de {len(playlist)}</h3>
     """, unsafe_allow_html=True)
 
     # Player de áudio centralizado
     col1, col2, col3 = st.columns([1, 3, 1])
     with col2:
-        audio_bytes = download_audio_from_s3(
-            current_audio.get("bucket", st.secrets["AWS_S3_BUCKET"]),
-            current_audio["s3_key"]
+        audio_bucket = current_audio.get("bucket", st.secrets["AWS_S3_BUCKET"])
+        audio_source = resolve_audio_source(
+            AUDIO_DELIVERY_MODE,
+            lambda: get_presigned_url(audio_bucket, current_audio["s3_key"]),
+            lambda: download_audio_from_s3(audio_bucket, current_audio["s3_key"], current_audio.get("etag")),
+            lambda: get_stream_url(audio_bucket, current_audio["s3_key"], current_audio.get("etag"))
         )
-        st.audio(audio_bytes, format=current_audio.get('content_type', 'audio/mpeg'))
+        st.audio(audio_source, format=current_audio.get('content_type') or content_type_for(current_audio['s3_key']))
+
+    # Nos modos proxy e stream, baixa os próximos áudios para o cache enquanto o atual é ouvido
+    if AUDIO_DELIVERY_MODE in (DELIVERY_PROXY, DELIVERY_STREAM) and init_s3_client():
+        prefetch_audio_files(audio_files, playlist, st.session_state.current_index)
 
     # Verificar se já foi avaliado
     current_score = st.session_state.evaluations.get(current_audio['anonymous_id'], None)
@@ -512,16 +660,8 @@ if st.session_state.current_index < len(audio_files):
     st.markdown("<h4 style='text-align: center; margin: 2rem 0 1rem 0;'>Qual nota você daria para esta voz?</h4>", unsafe_allow_html=True)
 
     score_cols = st.columns(5)
-    scores = [
-        ("1 - Muito Inadequada", "❌", 1),
-        ("2 - Inadequada", "👎", 2),
-        ("3 - Razoável", "😐", 3),
-        ("4 - Boa", "👍", 4),
-        ("5 - Excelente", "⭐", 5)
-    ]
-
     selected_score = None
-    for col, (label, emoji, score) in zip(score_cols, scores):
+    for col, (label, emoji, score) in zip(score_cols, SCORE_BUTTONS):
         with col:
             button_key = f"score_{score}_{st.session_state.current_index}"
             if st.button(f"{emoji}\n{score}", key=button_key, use_container_width=True):
@@ -535,6 +675,12 @@ if st.session_state.current_index < len(audio_files):
                     current_audio['duration'],
                     st.session_state.session_id
                 )
+                init_scheduler().record(
+                    current_audio['anonymous_id'],
+                    current_audio['category'],
+                    score,
+                    previous_score=st.session_state.evaluations.get(current_audio['anonymous_id'])
+                )
                 st.session_state.evaluations[current_audio['anonymous_id']] = score
                 st.session_state.current_index += 1
                 st.rerun()
@@ -568,7 +714,7 @@ else:
     <div class="completion-message">
         <h2>🎉 Obrigado por concluir a avaliação!</h2>
         <p style="font-size: 1.2rem;">Sua opinião é fundamental para criarmos a melhor experiência com a Mamãe Pingo.</p>
-        <p>Você avaliou <strong>{len(st.session_state.evaluations)}</strong> de <strong>{len(audio_files)}</strong> arquivos de áudio.</p>
+        <p>Você avaliou <strong>{len(st.session_state.evaluations)}</strong> de <strong>{len(playlist)}</strong> arquivos de áudio.</p>
     </div>
     """, unsafe_allow_html=True)
 
@@ -577,7 +723,7 @@ else:
     with col1:
         if st.session_state.current_index > 0:
             if st.button("⬅️ Voltar para revisar", use_container_width=True):
-                st.session_state.current_index = len(audio_files) - 1 if audio_files else 0
+                st.session_state.current_index = len(playlist) - 1 if playlist else 0
                 st.rerun()
 
     with col2:
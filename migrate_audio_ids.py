@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Migração das avaliações para os IDs anônimos estáveis
+
+Os IDs antigos eram `audio_<md5(nome)[:8]>_<posição na listagem>` e mudavam
+quando arquivos eram adicionados ou removidos. Este script recalcula o ID
+estável (chave S3 + ETag) de cada avaliação, casando `category` e
+`original_filename` com o catálogo atual, e regrava o documento como
+`{session_id}_{novo_id}`, apagando o antigo. O ID antigo fica registrado em
+`legacy_anonymous_id`. Se a sessão já tiver um documento com o novo ID,
+prevalece o voto mais recente.
+
+Os documentos apagados ficam listados em `replaces` no documento que os
+substitui: a cópia local do painel (evaluation_store) só vê documentos com
+`updated_at` novo e, sem isso, contaria o voto antigo e o novo.
+
+Uso:
+    python migrate_audio_ids.py           # simulação: só mostra o que mudaria
+    python migrate_audio_ids.py --apply   # aplica a migração
+"""
+
+import os
+import argparse
+
+import boto3
+from dotenv import load_dotenv
+from firebase_admin import firestore
+
+from audio_catalog import load_catalog
+from evaluation_store import REPLACES
+from vote_log import init_firestore_from_env
+
+# Cada migração usa duas escritas (set + delete) no mesmo WriteBatch
+MIGRATIONS_PER_BATCH = 250
+
+
+def build_id_map(catalog):
+    """Mapear (categoria, nome do arquivo) para o ID estável do catálogo"""
+    return {(entry["category"], entry["original_name"]): entry["anonymous_id"] for entry in catalog}
+
+
+def plan_migrations(docs, id_map):
+    """Listar (ref antiga, novo doc_id, novos dados) das avaliações a migrar
+
+    Quando `novo doc_id` é None, o documento antigo só é apagado (duplicado
+    mais antigo); quando `ref antiga` é None, o documento já tem o novo ID e
+    só é regravado para registrar os duplicados apagados em `replaces`.
+    Retorna também os IDs das avaliações sem arquivo no catálogo.
+    """
+    groups, unmatched = {}, []
+    for doc in docs:
+        data = doc.to_dict()
+        new_id = id_map.get((data.get("category"), data.get("original_filename")))
+        if new_id is None:
+            unmatched.append(doc.id)
+            continue
+        groups.setdefault(f"{data['session_id']}_{new_id}", []).append((doc, data, new_id))
+
+    migrations = []
+    for new_doc_id, group in groups.items():
+        # Vários documentos da mesma sessão podem cair no mesmo novo ID: vale o mais recente
+        group.sort(key=lambda item: (item[1].get("timestamp") is not None, item[1].get("timestamp") or 0))
+        *older, (doc, data, new_id) = group
+        migrations.extend((old_doc.reference, None, None) for old_doc, _, _ in older)
+        replaced = [old_doc.id for old_doc, _, _ in older if old_doc.id != new_doc_id]
+        if doc.id != new_doc_id:
+            new_data = {**data, "anonymous_id": new_id, "legacy_anonymous_id": data.get("anonymous_id"),
+                        REPLACES: replaced + [doc.id], "updated_at": firestore.SERVER_TIMESTAMP}
+            migrations.append((doc.reference, new_doc_id, new_data))
+        elif replaced:
+            new_data = {**data, REPLACES: replaced, "updated_at": firestore.SERVER_TIMESTAMP}
+            migrations.append((None, new_doc_id, new_data))
+    return migrations, unmatched
+
+
+def apply_migrations(db, collection, migrations):
+    """Gravar os novos documentos e apagar os antigos, em lotes"""
+    for start in range(0, len(migrations), MIGRATIONS_PER_BATCH):
+        batch = db.batch()
+        for old_ref, new_doc_id, new_data in migrations[start:start + MIGRATIONS_PER_BATCH]:
+            if new_doc_id is not None:
+                batch.set(db.collection(collection).document(new_doc_id), new_data)
+            if old_ref is not None:
+                batch.delete(old_ref)
+        batch.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="aplicar a migração (padrão: simulação)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    collection = os.getenv("FIREBASE_DB_NAME", "evaluations")
+    s3_client = boto3.client(
+        "s3",
+        region_name=os.getenv("AWS_REGION", "us-east-1"),
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+    )
+
+    catalog = load_catalog(
+        s3_client,
+        os.getenv("AWS_S3_BUCKET", "mamae-pingo-audio-files"),
+        os.getenv("S3_PREFIX", "audio-evaluations/")
+    )
+    print(f"📚 Catálogo: {len(catalog)} arquivos")
+
+    db = init_firestore_from_env()
+    migrations, unmatched = plan_migrations(db.collection(collection).stream(), build_id_map(catalog))
+
+    rewrites = sum(1 for old_ref, new_doc_id, _ in migrations if old_ref is not None and new_doc_id is not None)
+    print(f"🔁 Documentos a migrar: {rewrites}")
+    print(f"🗑️  Duplicados a remover: {sum(1 for _, new_doc_id, _ in migrations if new_doc_id is None)}")
+    if unmatched:
+        print(f"⚠️  {len(unmatched)} avaliações sem arquivo correspondente no catálogo (mantidas como estão)")
+
+    if not args.apply:
+        print("\nSimulação concluída. Use --apply para gravar as mudanças.")
+        return
+
+    apply_migrations(db, collection, migrations)
+    print("✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Ordem de apresentação dos áudios por sessão
+
+A lista de cada sessão é uma permutação de índices inteiros sobre o catálogo
+(sem copiar as entradas), gerada a partir de uma semente. Com a mesma semente
+e o mesmo catálogo a ordem é sempre a mesma, então sessões retomadas e as
+análises podem reconstruí-la sem que ela seja armazenada.
+
+Desenhos disponíveis:
+- "random": embaralhamento uniforme (Fisher-Yates), O(n)
+- "latin_square": intercala as categorias seguindo uma linha de um quadrado
+  latino balanceado (Williams), para que cada categoria apareça em cada
+  posição e depois de cada outra categoria com a mesma frequência entre sessões
+"""
+
+import random
+
+DESIGN_RANDOM = "random"
+DESIGN_LATIN_SQUARE = "latin_square"
+DESIGNS = (DESIGN_RANDOM, DESIGN_LATIN_SQUARE)
+
+
+def session_seed(session_id):
+    """Semente da lista derivada do ID da sessão (hexadecimal)"""
+    return int(session_id, 16)
+
+
+def random_order(n, seed):
+    """Permutação uniforme de range(n)"""
+    order = list(range(n))
+    random.Random(seed).shuffle(order)
+    return order
+
+
+def williams_row(k, row):
+    """Linha `row` de um quadrado latino de Williams com k tratamentos
+
+    Para k ímpar o desenho balanceado tem 2k linhas (as k linhas e suas inversas).
+    """
+    base = [0]
+    low, high = 1, k - 1
+    while len(base) < k:
+        base.append(low)
+        low += 1
+        if len(base) < k:
+            base.append(high)
+            high -= 1
+
+    rows = k if k % 2 == 0 else 2 * k
+    row %= rows
+    sequence = [(b + row) % k for b in base]
+    return sequence[::-1] if row >= k else sequence
+
+
+def latin_square_order(categories, seed):
+    """Intercalar as categorias na ordem de uma linha do quadrado latino
+
+    `categories` é a categoria de cada índice do catálogo. Dentro de cada
+    categoria a ordem é embaralhada pela semente.
+    """
+    rng = random.Random(seed)
+    groups = {}
+    for index, category in enumerate(categories):
+        groups.setdefault(category, []).append(index)
+
+    names = sorted(groups)
+    for name in names:
+        rng.shuffle(groups[name])
+
+    row = [groups[names[i]] for i in williams_row(len(names), seed)] if names else []
+    order = []
+    position = 0
+    while len(order) < len(categories):
+        for group in row:
+            if position < len(group):
+                order.append(group[position])
+        position += 1
+    return order
+
+
+def build_playlist(audio_files, seed, design=DESIGN_RANDOM):
+    """Índices de `audio_files` na ordem de apresentação da sessão"""
+    if design == DESIGN_LATIN_SQUARE:
+        return latin_square_order([audio["category"] for audio in audio_files], seed)
+    return random_order(len(audio_files), seed)
@@ -0,0 +1,160 @@
+"""
+Agendamento adaptativo dos áudios entre avaliadores
+
+Mantém, em memória do processo, a contagem, média e variância das notas de
+cada arquivo e de cada categoria. Cada nova sessão recebe uma lista curta,
+sorteada com peso maior para os arquivos com maior incerteza (erro padrão da
+média, com prior para arquivos com poucas notas) e para as categorias menos
+avaliadas. Atribuições ainda não respondidas contam como pendentes, para que
+sessões simultâneas não recebam todas os mesmos arquivos.
+
+Diferente das listas completas, a lista adaptativa depende do estado atual
+das notas, então é guardada na sessão em vez de ser reconstruída pela semente.
+"""
+
+import math
+import time
+import heapq
+import random
+import threading
+
+
+class _RunningStats:
+    """Contagem, média e soma dos quadrados dos desvios (Welford), com remoção"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = value - self.mean
+        self.count -= 1
+        self.mean -= delta / self.count
+        self.m2 = max(0.0, self.m2 - delta * (value - self.mean))
+
+
+class AdaptiveScheduler:
+    """Estatísticas vivas por arquivo e sorteio de listas que priorizam a incerteza"""
+
+    def __init__(self, prior_variance=1.5, prior_weight=2.0, pending_ttl=1800.0):
+        self.prior_variance = prior_variance
+        self.prior_weight = prior_weight
+        self.pending_ttl = pending_ttl
+        self._lock = threading.Lock()
+        self._files = {}
+        self._categories = {}
+        self._pending = {}
+
+    def record(self, audio_id, category, score, previous_score=None):
+        """Registrar uma nota (ou a troca de uma nota anterior da mesma sessão)"""
+        with self._lock:
+            file_stats = self._files.setdefault(audio_id, _RunningStats())
+            category_stats = self._categories.setdefault(category, _RunningStats())
+            if previous_score is not None:
+                file_stats.remove(previous_score)
+                category_stats.remove(previous_score)
+            file_stats.add(score)
+            category_stats.add(score)
+
+            pending = self._pending.get(audio_id)
+            if pending:
+                pending.pop(0)
+
+    def standard_error(self, audio_id, pending=0):
+        """Erro padrão da média do arquivo, com prior para poucas notas"""
+        stats = self._files.get(audio_id)
+        count = stats.count if stats else 0
+        m2 = stats.m2 if stats else 0.0
+        variance = (m2 + self.prior_weight * self.prior_variance) / (count + self.prior_weight)
+        return math.sqrt(variance / (count + pending + 1))
+
+    def _prune_pending(self, now):
+        for audio_id in list(self._pending):
+            expiries = [t for t in self._pending[audio_id] if t > now]
+            if expiries:
+                self._pending[audio_id] = expiries
+            else:
+                del self._pending[audio_id]
+
+    def assign(self, audio_files, length, seed, max_seconds=None):
+        """Sortear `length` índices de `audio_files`, com peso pela incerteza
+
+        Usa amostragem ponderada sem reposição (chaves u^(1/peso)). O peso de
+        cada arquivo é o erro padrão da média, multiplicado por um fator que
+        favorece categorias com menos notas.
+
+        Com `max_seconds`, a lista também respeita um orçamento de duração:
+        os arquivos são percorridos na ordem do sorteio e os que estourariam
+        o orçamento são pulados. Arquivos sem `duration_seconds` contam com a
+        duração média dos demais. A lista tem ao menos um arquivo.
+        """
+        rng = random.Random(seed)
+        now = time.time()
+        with self._lock:
+            self._prune_pending(now)
+
+            counts = {}
+            for audio in audio_files:
+                category = audio["category"]
+                if category not in counts:
+                    stats = self._categories.get(category)
+                    counts[category] = stats.count if stats else 0
+            average = sum(counts.values()) / len(counts) if counts else 0.0
+            category_factor = {c: math.sqrt((average + 1) / (n + 1)) for c, n in counts.items()}
+
+            keys = []
+            for index, audio in enumerate(audio_files):
+                audio_id = audio["anonymous_id"]
+                weight = self.standard_error(audio_id, len(self._pending.get(audio_id, ())))
+                weight *= category_factor[audio["category"]]
+                keys.append((rng.random() ** (1.0 / weight), index))
+
+            if max_seconds is None:
+                chosen = [index for _, index in heapq.nlargest(length, keys)]
+            else:
+                chosen = self._fit_budget(audio_files, sorted(keys, reverse=True), length, max_seconds)
+            expiry = now + self.pending_ttl
+            for index in chosen:
+                self._pending.setdefault(audio_files[index]["anonymous_id"], []).append(expiry)
+        return chosen
+
+    @staticmethod
+    def _fit_budget(audio_files, ranked, length, max_seconds):
+        known = [audio["duration_seconds"] for audio in audio_files if audio.get("duration_seconds")]
+        fallback = sum(known) / len(known) if known else 0.0
+        chosen, total = [], 0.0
+        for _, index in ranked:
+            seconds = audio_files[index].get("duration_seconds") or fallback
+            if total + seconds > max_seconds:
+                continue
+            chosen.append(index)
+            total += seconds
+            if len(chosen) >= length:
+                break
+        if not chosen and ranked:
+            chosen.append(ranked[0][1])
+        return chosen
+
+    def snapshot(self):
+        """Contagem, média e variância por arquivo"""
+        with self._lock:
+            return {
+                audio_id: {
+                    "count": stats.count,
+                    "mean": stats.mean,
+                    "variance": stats.m2 / (stats.count - 1) if stats.count > 1 else None,
+                }
+                for audio_id, stats in self._files.items()
+            }
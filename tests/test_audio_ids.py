@@ -0,0 +1,106 @@
+"""
+IDs estáveis para catálogos vindos de um manifesto v1 (sem ETag)
+
+Uso: python -m unittest discover tests
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_catalog import AudioCatalog, load_catalog, stable_audio_id  # noqa: E402
+from evaluation_store import EvaluationStore  # noqa: E402
+from migrate_audio_ids import build_id_map, plan_migrations  # noqa: E402
+
+PREFIX = "audio-evaluations/"
+MODIFIED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+OBJECTS = {
+    f"{PREFIX}luciane/a.wav": '"etag-a"',
+    f"{PREFIX}library/b.wav": '"etag-b"',
+}
+# Manifesto gravado pelo uploader antigo: IDs por posição e sem ETag
+MANIFEST_V1 = {
+    "files": [
+        {"anonymous_id": "audio_0cc175b9_0", "original_name": "a.wav", "category": "luciane",
+         "duration": "curto", "s3_key": f"{PREFIX}luciane/a.wav"},
+        {"anonymous_id": "audio_92eb5ffe_1", "original_name": "b.wav", "category": "library",
+         "duration": "curto", "s3_key": f"{PREFIX}library/b.wav"},
+    ],
+}
+
+
+class FakeS3:
+    """Só o que o catálogo usa: GetObject do manifesto e a listagem paginada"""
+
+    def get_object(self, Bucket, Key, **kwargs):
+        return {"Body": io.BytesIO(json.dumps(MANIFEST_V1).encode()), "ETag": '"manifest"'}
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        yield {"Contents": [
+            {"Key": key, "ETag": etag, "LastModified": MODIFIED, "Size": 10}
+            for key, etag in OBJECTS.items()
+        ]}
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.reference = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class V1ManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def test_load_catalog_uses_stable_ids(self):
+        catalog = load_catalog(FakeS3(), "bucket", PREFIX, self.cache_dir)
+        self.assertEqual(
+            {entry["s3_key"]: entry["anonymous_id"] for entry in catalog},
+            {key: stable_audio_id(key, etag) for key, etag in OBJECTS.items()},
+        )
+        self.assertTrue(all(entry["etag"] for entry in catalog))
+
+    def test_refresh_keeps_stable_ids(self):
+        catalog = AudioCatalog(FakeS3(), "bucket", PREFIX, self.cache_dir)
+        ids = {entry["s3_key"]: entry["anonymous_id"] for entry in catalog.snapshot()}
+        catalog.refresh()
+        self.assertEqual(ids, {entry["s3_key"]: entry["anonymous_id"] for entry in catalog.snapshot()})
+
+    def test_migration_moves_votes_to_stable_ids(self):
+        catalog = load_catalog(FakeS3(), "bucket", PREFIX, self.cache_dir)
+        legacy = FakeDoc("s1_audio_0cc175b9_0", {
+            "session_id": "s1", "anonymous_id": "audio_0cc175b9_0",
+            "category": "luciane", "original_filename": "a.wav", "score": 4,
+        })
+        migrations, unmatched = plan_migrations([legacy], build_id_map(catalog))
+        new_id = stable_audio_id(f"{PREFIX}luciane/a.wav", "etag-a")
+        self.assertEqual(unmatched, [])
+        self.assertEqual(len(migrations), 1)
+        old_ref, new_doc_id, new_data = migrations[0]
+        self.assertEqual((old_ref, new_doc_id), ("s1_audio_0cc175b9_0", f"s1_{new_id}"))
+        self.assertEqual(new_data["anonymous_id"], new_id)
+        self.assertEqual(new_data["legacy_anonymous_id"], "audio_0cc175b9_0")
+
+        # A cópia local do painel troca o voto antigo pelo migrado, sem contá-lo duas vezes
+        store = EvaluationStore(os.path.join(self.cache_dir, "evaluations.sqlite3"))
+        store.apply_changes([(legacy.id, {**legacy.to_dict(), "updated_at": 1.0})])
+        store.apply_changes([(new_doc_id, {**new_data, "updated_at": 2.0})])
+        self.assertEqual([doc_id for doc_id, _ in store.rows()], [new_doc_id])
+
+
+if __name__ == "__main__":
+    unittest.main()
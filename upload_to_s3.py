@@ -5,36 +5,64 @@ Este script deve ser executado uma vez para enviar todos os arquivos de áudio p
 """
 
 import os
-import boto3
-from pathlib import Path
-from dotenv import load_dotenv
 import json
+import time
+import boto3
 import hashlib
+import argparse
+import threading
+from dotenv import load_dotenv
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from boto3.s3.transfer import TransferConfig
 
-# Carregar variáveis de ambiente
+# Carregar variáveis de ambiente antes dos módulos locais, que leem
+# configurações (ex.: LONG_CLIP_SECONDS) ao serem importados
 load_dotenv()
 
-# Configurar cliente S3
+from audio_catalog import (AUDIO_EXTENSIONS, MANIFEST_VERSION, content_type_for, duration_class, load_catalog,
+                           manifest_key, originals_prefix, stable_audio_id)
+from audio_metadata import probe_audio
+from audio_transcode import DEFAULT_BITRATE, DEFAULT_LOUDNESS, TRANSCODE_FORMATS, Transcoder, ffmpeg_available
+
+# Configurar cliente S3 (AWS_ENDPOINT_URL permite usar um S3 local, ex.: moto server)
 s3_client = boto3.client(
     's3',
     region_name=os.getenv('AWS_REGION', 'us-east-1'),
     aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+    endpoint_url=os.getenv('AWS_ENDPOINT_URL') or None
 )
 
 BUCKET_NAME = os.getenv('AWS_S3_BUCKET', 'mamae-pingo-audio-files')
 S3_PREFIX = os.getenv('S3_PREFIX', 'audio-evaluations/')
 
-def create_bucket_if_not_exists():
+# Diretórios de áudio (o nome da pasta vira a categoria)
+AUDIO_DIRS = [
+    '../library',
+    '../luciane/no-enhancement',
+    '../luciane/with-enhancement-10',
+    '../luciane/with-enhancement-30',
+    '../new_synthesized',
+    '../synthesized',
+    # '.'  # Diretório raiz
+]
+
+DEFAULT_WORKERS = 8
+DEFAULT_CHUNK_MB = 8
+DEFAULT_CHECKPOINT = '.upload_checkpoint.jsonl'
+MB = 1024 * 1024
+
+
+def create_bucket_if_not_exists(s3_client=s3_client, bucket=BUCKET_NAME):
     """Criar bucket S3 se não existir"""
     try:
-        s3_client.head_bucket(Bucket=BUCKET_NAME)
-        print(f"✅ Bucket '{BUCKET_NAME}' já existe")
+        s3_client.head_bucket(Bucket=bucket)
+        print(f"✅ Bucket '{bucket}' já existe")
     except:
         try:
-            s3_client.create_bucket(Bucket=BUCKET_NAME)
-            print(f"✅ Bucket '{BUCKET_NAME}' criado com sucesso")
+            s3_client.create_bucket(Bucket=bucket)
+            print(f"✅ Bucket '{bucket}' criado com sucesso")
 
             # Configurar CORS para permitir acesso do navegador
             cors_configuration = {
@@ -46,7 +74,7 @@ def create_bucket_if_not_exists():
                 }]
             }
             s3_client.put_bucket_cors(
-                Bucket=BUCKET_NAME,
+                Bucket=bucket,
                 CORSConfiguration=cors_configuration
             )
             print("✅ CORS configurado para o bucket")
@@ -55,26 +83,81 @@ def create_bucket_if_not_exists():
             return False
     return True
 
-def upload_audio_files():
-    """Fazer upload de todos os arquivos de áudio para o S3"""
-
-    # Diretórios de áudio
-    audio_dirs = [
-        '../library',
-        '../luciane/no-enhancement',
-        '../luciane/with-enhancement-10',
-        '../luciane/with-enhancement-30',
-        '../new_synthesized',
-        '../synthesized',
-        # '.'  # Diretório raiz
-    ]
-
-    audio_extensions = ['.wav', '.mp3']
-    uploaded_files = []
-    audio_metadata = []
-
-    print("\n📤 Iniciando upload dos arquivos de áudio...\n")
 
+def transfer_config(workers=DEFAULT_WORKERS, chunk_mb=DEFAULT_CHUNK_MB):
+    """Multipart a partir de `chunk_mb` MB, em partes de `chunk_mb` MB"""
+    return TransferConfig(
+        multipart_threshold=chunk_mb * MB,
+        multipart_chunksize=chunk_mb * MB,
+        max_concurrency=max(1, workers // 2),
+        use_threads=True
+    )
+
+
+def local_etag(file_path, part_size=None):
+    """ETag que o S3 daria ao arquivo
+
+    Upload simples: MD5 do conteúdo. Multipart (`part_size`): MD5 da
+    concatenação dos MD5 de cada parte, seguido de "-<número de partes>".
+    """
+    if part_size is None:
+        digest = hashlib.md5()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(MB), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    part_digests = []
+    with open(file_path, 'rb') as f:
+        for part in iter(lambda: f.read(part_size), b''):
+            part_digests.append(hashlib.md5(part).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def matches_remote(file_path, size, remote_etag, chunk_size):
+    """O conteúdo local é o mesmo do objeto remoto (pelo ETag)?"""
+    if '-' not in remote_etag:
+        return local_etag(file_path) == remote_etag
+
+    # Multipart: tenta o tamanho de parte configurado e o deduzido do número de partes
+    parts = int(remote_etag.rsplit('-', 1)[1])
+    part_size = -(-size // parts)
+    candidates = {chunk_size, part_size, -(-part_size // MB) * MB}
+    return any(
+        local_etag(file_path, candidate) == remote_etag
+        for candidate in sorted(candidates)
+        if candidate > 0 and -(-size // candidate) == parts
+    )
+
+
+def list_remote_objects(s3_client, bucket, prefix):
+    """{chave: (ETag, tamanho)} dos objetos já enviados"""
+    remote = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            remote[obj['Key']] = (obj['ETag'].strip('"'), obj['Size'])
+    return remote
+
+
+def load_checkpoint(path):
+    """Uploads já concluídos em execuções anteriores: {chave: registro}"""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # linha incompleta de uma execução interrompida
+            done[record['s3_key']] = record
+    return done
+
+
+def find_audio_files(audio_dirs, prefix):
+    """Arquivos de áudio locais como (caminho, nome, categoria, chave S3)"""
+    found = []
     for dir_path in audio_dirs:
         if not os.path.exists(dir_path):
             print(f"⚠️  Diretório '{dir_path}' não encontrado, pulando...")
@@ -83,99 +166,281 @@ def upload_audio_files():
         # Listar arquivos no diretório
         files = os.listdir(dir_path) if dir_path != '.' else [f for f in os.listdir(dir_path) if os.path.isfile(f)]
 
-        for file in files:
-            if any(file.endswith(ext) for ext in audio_extensions):
+        for file in sorted(files):
+            if any(file.endswith(ext) for ext in AUDIO_EXTENSIONS):
                 file_path = os.path.join(dir_path, file) if dir_path != '.' else file
 
                 # Determinar categoria
                 if dir_path == '.':
                     category = 'raiz'
                 else:
-                    category = os.path.basename(dir_path)
-
-                # Determinar duração
-                duration = 'longo' if 'pingocast' in file.lower() or len(file) > 50 else 'curto'
-
-                # Gerar ID único
-                hash_obj = hashlib.md5(file.encode())
-                anonymous_id = f"audio_{hash_obj.hexdigest()[:8]}_{len(uploaded_files)}"
-
-                # Criar chave S3
-                s3_key = f"{S3_PREFIX}{category}/{file}"
+                    category = os.path.basename(os.path.normpath(dir_path))
+
+                found.append((file_path, file, category, f"{prefix}{category}/{file}"))
+    return found
+
+
+class UploadStats:
+    """Contadores de arquivos e bytes para o resumo de vazão"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.uploaded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes_uploaded = 0
+
+    def add(self, status, size=0):
+        with self._lock:
+            setattr(self, status, getattr(self, status) + 1)
+            if status == 'uploaded':
+                self.bytes_uploaded += size
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.bytes_uploaded / MB / elapsed if elapsed > 0 else 0.0
+        files_rate = self.uploaded / elapsed if elapsed > 0 else 0.0
+        return (f"{self.uploaded} enviados, {self.skipped} sem mudanças, {self.failed} com erro | "
+                f"{self.bytes_uploaded / MB:.1f} MB em {elapsed:.1f}s ({rate:.2f} MB/s, {files_rate:.1f} arquivos/s)")
+
+
+def upload_audio_files(s3_client=s3_client, bucket=BUCKET_NAME, prefix=S3_PREFIX, audio_dirs=AUDIO_DIRS,
+                       workers=DEFAULT_WORKERS, chunk_mb=DEFAULT_CHUNK_MB, checkpoint_path=DEFAULT_CHECKPOINT,
+                       metadata_file='audio_metadata.json', transcoder=None, prune=False):
+    """Fazer upload dos arquivos de áudio para o S3 em paralelo, pulando os que não mudaram
+
+    Um arquivo é pulado quando já existe no S3 com o mesmo tamanho e ETag
+    (MD5 local, ou MD5 das partes em multipart). Cada upload concluído é
+    registrado no checkpoint; se o tamanho e a data de modificação locais
+    batem com o registro e o ETag remoto é o mesmo, nem o MD5 é recalculado.
+
+    Com um `transcoder` (audio_transcode.Transcoder), os clipes são antes
+    convertidos em paralelo e a versão convertida vira o áudio do catálogo;
+    o original é enviado para `{prefix}originals/`. Com `prune`, áudios das
+    categorias processadas que estão no S3 mas não no novo manifesto (ex.: os
+    .wav enviados antes da transcodificação) são apagados, se não houve erros.
+
+    O novo manifesto é mesclado com o que já está no S3: as entradas das
+    categorias fora desta execução e as dos arquivos que falharam são
+    mantidas, então rodar com parte dos diretórios não tira as outras
+    categorias do app.
+    """
+    config = transfer_config(workers, chunk_mb)
+    files = find_audio_files(audio_dirs, prefix)
+    remote = list_remote_objects(s3_client, bucket, prefix)
+    previous = load_catalog(s3_client, bucket, prefix)
+    checkpoint = load_checkpoint(checkpoint_path)
+    checkpoint_lock = threading.Lock()
+    checkpoint_file = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+    stats = UploadStats()
+
+    converted = [None] * len(files)
+    if transcoder is not None:
+        print(f"\n🎛️  Convertendo {len(files)} arquivos para {transcoder.fmt} {transcoder.bitrate} "
+              f"({transcoder.loudness} LUFS, {transcoder.workers} em paralelo)...")
+        started = time.monotonic()
+        converted = transcoder.convert_many([(file_path, category, file) for file_path, file, category, _ in files])
+        print(f"✅ Conversão concluída em {time.monotonic() - started:.1f}s")
+
+    print(f"\n📤 Iniciando upload de {len(files)} arquivos de áudio ({workers} em paralelo)...\n")
+
+    def upload_object(local_path, s3_key):
+        """Enviar um arquivo, a menos que o S3 já tenha o mesmo conteúdo; retorna (status, etag, tamanho)"""
+        stat = os.stat(local_path)
+        remote_etag, remote_size = remote.get(s3_key, (None, None))
+        record = checkpoint.get(s3_key)
+
+        unchanged = False
+        if remote_etag is not None and remote_size == stat.st_size:
+            if record and record['etag'] == remote_etag and record['size'] == stat.st_size \
+                    and record['mtime_ns'] == stat.st_mtime_ns:
+                unchanged = True
+            else:
+                unchanged = matches_remote(local_path, stat.st_size, remote_etag, config.multipart_chunksize)
+
+        if unchanged:
+            etag = remote_etag
+            status = 'skipped'
+        else:
+            s3_client.upload_file(
+                local_path,
+                bucket,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': content_type_for(s3_key),
+                    'CacheControl': 'public, max-age=86400'  # Cache por 24 horas
+                },
+                Config=config
+            )
+            # ETag do objeto enviado (usado como versão no cache de áudio do app)
+            etag = s3_client.head_object(Bucket=bucket, Key=s3_key)['ETag'].strip('"')
+            status = 'uploaded'
+
+        if checkpoint_file and (status == 'uploaded' or record is None or record['etag'] != etag):
+            with checkpoint_lock:
+                checkpoint_file.write(json.dumps({
+                    's3_key': s3_key, 'etag': etag, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns
+                }) + '\n')
+                checkpoint_file.flush()
+
+        stats.add(status, stat.st_size)
+        return status, etag, stat.st_size
+
+    def process(file_path, file, category, s3_key, conversion):
+        metadata = {
+            'original_name': file,
+            'category': category,
+        }
+        if conversion is not None:
+            # Original guardado à parte; o catálogo aponta para a versão convertida
+            converted_path, info = conversion
+            original_key = f"{originals_prefix(prefix)}{category}/{file}"
+            upload_object(file_path, original_key)
+            s3_key = os.path.splitext(s3_key)[0] + transcoder.extension
+            file_path = converted_path
+            metadata.update({
+                'original_s3_key': original_key,
+                'original_content_type': content_type_for(file),
+                'source_loudness': info['source_loudness'],
+                'target_loudness': info['target_loudness'],
+                'bitrate': info['bitrate'],
+            })
+
+        status, etag, size = upload_object(file_path, s3_key)
+
+        # Duração, taxa de amostragem, canais e tamanho lidos do cabeçalho do arquivo enviado
+        audio_info = probe_audio(file_path)
+        if audio_info['duration_seconds'] is None and conversion is not None:
+            audio_info['duration_seconds'] = conversion[1]['duration_seconds']
+        metadata.update(audio_info)
+        metadata.update({
+            'anonymous_id': stable_audio_id(s3_key, etag),  # ID estável (chave S3 + hash do conteúdo)
+            'duration': duration_class(file, audio_info['duration_seconds']),
+            's3_key': s3_key,
+            'bucket': bucket,
+            'etag': etag,
+            'content_type': content_type_for(s3_key)
+        })
+        return status, size, metadata
 
+    audio_metadata = []
+    failed = set()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload') as executor:
+            futures = {}
+            for entry, conversion in zip(files, converted):
+                if isinstance(conversion, Exception):
+                    stats.add('failed')
+                    failed.add((entry[2], entry[1]))
+                    print(f"❌ Erro na conversão de {entry[0]}: {conversion}")
+                    continue
+                futures[executor.submit(process, *entry, conversion)] = entry
+            for future in as_completed(futures):
+                file_path, file, category, _ = futures[future]
                 try:
-                    # Upload do arquivo
-                    print(f"📤 Enviando: {file_path} -> s3://{BUCKET_NAME}/{s3_key}")
-
-                    # Detectar content type
-                    content_type = 'audio/wav' if file.endswith('.wav') else 'audio/mpeg'
-
-                    s3_client.upload_file(
-                        file_path,
-                        BUCKET_NAME,
-                        s3_key,
-                        ExtraArgs={
-                            'ContentType': content_type,
-                            'CacheControl': 'public, max-age=86400'  # Cache por 24 horas
-                        }
-                    )
-
-                    # Adicionar metadata
-                    metadata = {
-                        'anonymous_id': anonymous_id,
-                        'original_name': file,
-                        'category': category,
-                        'duration': duration,
-                        's3_key': s3_key,
-                        'bucket': BUCKET_NAME,
-                        'content_type': content_type
-                    }
-                    audio_metadata.append(metadata)
-                    uploaded_files.append(file_path)
-
-                    print(f"✅ Upload concluído: {file}")
-
+                    status, size, metadata = future.result()
                 except Exception as e:
+                    stats.add('failed')
+                    failed.add((category, file))
                     print(f"❌ Erro no upload de {file}: {e}")
+                    continue
+                audio_metadata.append(metadata)
+                if status == 'uploaded':
+                    print(f"✅ {file_path} -> s3://{bucket}/{metadata['s3_key']} ({size / MB:.1f} MB)")
+    finally:
+        if checkpoint_file:
+            checkpoint_file.close()
+
+    audio_metadata = merge_manifest_entries(previous, audio_metadata, {entry[2] for entry in files}, failed)
+
+    # Ordem estável no manifesto, independente da ordem de conclusão
+    audio_metadata.sort(key=lambda item: item['s3_key'])
 
     # Salvar metadata em um arquivo JSON
-    metadata_file = 'audio_metadata.json'
     with open(metadata_file, 'w', encoding='utf-8') as f:
         json.dump({
+            'manifest_version': MANIFEST_VERSION,
             'upload_date': datetime.now().isoformat(),
             'total_files': len(audio_metadata),
-            'bucket': BUCKET_NAME,
-            'prefix': S3_PREFIX,
+            'bucket': bucket,
+            'prefix': prefix,
             'files': audio_metadata
         }, f, indent=2, ensure_ascii=False)
 
     print(f"\n✅ Upload concluído!")
-    print(f"📊 Total de arquivos enviados: {len(uploaded_files)}")
+    print(f"📊 {stats.summary()}")
     print(f"📄 Metadata salvo em: {metadata_file}")
 
-    # Upload do arquivo de metadata para o S3
+    # Upload do arquivo de metadata para o S3 (manifesto lido pelo app na inicialização)
     try:
         s3_client.upload_file(
             metadata_file,
-            BUCKET_NAME,
-            f"{S3_PREFIX}metadata.json",
-            ExtraArgs={'ContentType': 'application/json'}
+            bucket,
+            manifest_key(prefix),
+            ExtraArgs={'ContentType': 'application/json', 'CacheControl': 'no-cache'}
         )
-        print(f"✅ Metadata enviado para S3: s3://{BUCKET_NAME}/{S3_PREFIX}metadata.json")
+        print(f"✅ Metadata enviado para S3: s3://{bucket}/{manifest_key(prefix)}")
     except Exception as e:
         print(f"❌ Erro ao enviar metadata: {e}")
 
+    if prune and stats.failed:
+        print("⚠️  Houve erros: nada foi removido do S3 (--prune ignorado)")
+    elif prune:
+        categories = sorted({category for _, _, category, _ in files})
+        prune_stale_objects(s3_client, bucket, prefix, remote, audio_metadata, categories)
+
     return audio_metadata
 
-def test_s3_access():
+
+def merge_manifest_entries(previous, uploaded, categories, failed):
+    """Juntar as entradas enviadas agora com as do manifesto anterior
+
+    Do manifesto anterior ficam as entradas das categorias que não foram
+    processadas e as dos arquivos que falharam (`failed`, pares categoria e
+    nome); as demais foram substituídas ou saíram da pasta local.
+    """
+    merged = {entry['s3_key']: entry for entry in uploaded}
+    for entry in previous:
+        if entry['s3_key'] in merged:
+            continue
+        if entry['category'] not in categories or (entry['category'], entry['original_name']) in failed:
+            merged[entry['s3_key']] = entry
+    return list(merged.values())
+
+
+def prune_stale_objects(s3_client, bucket, prefix, remote, audio_metadata, categories):
+    """Apagar áudios do catálogo no S3 que não estão no manifesto
+
+    Só são consideradas as pastas das `categories` processadas nesta
+    execução: rodar com parte dos diretórios não apaga as outras categorias.
+    Os originais não são tocados.
+    """
+    keep = {item['s3_key'] for item in audio_metadata}
+    category_prefixes = tuple(f"{prefix}{category}/" for category in categories)
+    stale = [
+        key for key in remote
+        if key not in keep and key.endswith(AUDIO_EXTENSIONS) and key.startswith(category_prefixes)
+        and not key.startswith(originals_prefix(prefix))
+    ]
+    for start in range(0, len(stale), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in stale[start:start + 1000]], 'Quiet': True}
+        )
+    print(f"🧹 {len(stale)} áudios antigos removidos do catálogo no S3")
+    return stale
+
+
+def test_s3_access(s3_client=s3_client, bucket=BUCKET_NAME, prefix=S3_PREFIX):
     """Testar acesso aos arquivos no S3"""
     print("\n🧪 Testando acesso aos arquivos no S3...")
 
     try:
         # Listar objetos no bucket
         response = s3_client.list_objects_v2(
-            Bucket=BUCKET_NAME,
-            Prefix=S3_PREFIX,
+            Bucket=bucket,
+            Prefix=prefix,
             MaxKeys=5
         )
 
@@ -189,7 +454,7 @@ def test_s3_access():
                 test_key = response['Contents'][0]['Key']
                 presigned_url = s3_client.generate_presigned_url(
                     'get_object',
-                    Params={'Bucket': BUCKET_NAME, 'Key': test_key},
+                    Params={'Bucket': bucket, 'Key': test_key},
                     ExpiresIn=3600  # 1 hora
                 )
                 print(f"\n🔗 URL de teste (válida por 1 hora):")
@@ -201,11 +466,25 @@ def test_s3_access():
         print(f"❌ Erro ao acessar S3: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload dos áudios para o S3")
+    parser.add_argument('--dirs', nargs='+', default=AUDIO_DIRS, help="pastas de áudio")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="uploads simultâneos")
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_MB, help="tamanho das partes do multipart (MB)")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="arquivo de progresso para retomar o upload")
+    parser.add_argument('--transcode', choices=['none', *TRANSCODE_FORMATS], default='none',
+                        help="converter os clipes (com loudness normalizada) antes do upload")
+    parser.add_argument('--bitrate', default=DEFAULT_BITRATE, help="taxa da conversão (ex.: 64k)")
+    parser.add_argument('--loudness', type=float, default=DEFAULT_LOUDNESS, help="alvo de loudness (LUFS)")
+    parser.add_argument('--transcode-workers', type=int, default=None, help="conversões simultâneas (padrão: núcleos)")
+    parser.add_argument('--prune', action='store_true', help="apagar do S3 os áudios que saíram do catálogo (só nas categorias de --dirs)")
+    parser.add_argument('--no-test', action='store_true', help="não testar o acesso ao final")
+    args = parser.parse_args()
+
     print("🚀 Script de Upload de Áudios para S3")
     print("=" * 50)
 
-    # Verificar variáveis de ambiente
-    required_vars = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY']
+    # Verificar variáveis de ambiente (um endpoint local, ex.: MinIO, dispensa as credenciais AWS)
+    required_vars = [] if os.getenv('AWS_ENDPOINT_URL') else ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY']
     missing_vars = [var for var in required_vars if not os.getenv(var)]
 
     if missing_vars:
@@ -217,11 +496,25 @@ if __name__ == "__main__":
     if not create_bucket_if_not_exists():
         exit(1)
 
+    transcoder = None
+    if args.transcode != 'none':
+        if not ffmpeg_available():
+            print("❌ ffmpeg não encontrado (instale-o ou defina FFMPEG_BINARY)")
+            exit(1)
+        transcoder = Transcoder(args.transcode, args.bitrate, args.loudness, workers=args.transcode_workers)
+
     # Fazer upload dos arquivos
-    metadata = upload_audio_files()
+    metadata = upload_audio_files(
+        audio_dirs=args.dirs,
+        workers=args.workers,
+        chunk_mb=args.chunk_mb,
+        checkpoint_path=args.checkpoint,
+        transcoder=transcoder,
+        prune=args.prune,
+    )
 
     # Testar acesso
-    if metadata:
+    if metadata and not args.no_test:
         test_s3_access()
 
-    print("\n✨ Script concluído!")
\ No newline at end of file
+    print("\n✨ Script concluído!")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Log local de votos (write-ahead log em SQLite)
+
+Cada voto é gravado primeiro neste log, com fsync, e só depois enviado ao
+Firestore pela fila em lote. Quando o lote é confirmado, as linhas são
+marcadas como enviadas. Se o Firestore estiver fora do ar ou o processo
+cair, os votos pendentes continuam no log e são reenviados depois. O reenvio
+é idempotente: usa o mesmo ID `{session_id}_{audio_id}` e envia apenas o voto
+mais recente de cada documento.
+
+Uso:
+    python vote_log.py status   # mostra votos pendentes
+    python vote_log.py replay   # envia os pendentes para o Firestore
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_LOG_PATH = os.path.join("data", "votes.sqlite3")
+
+# Votos já enviados ficam no log por este tempo antes de serem apagados
+KEEP_FLUSHED_SECONDS = 7 * 24 * 3600
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class VoteLog:
+    """Log de votos em SQLite (modo WAL), compartilhável entre processos"""
+
+    def __init__(self, path=DEFAULT_LOG_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: cada commit faz fsync do WAL
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS votes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                doc_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                flushed_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS votes_pending ON votes (doc_id, seq) WHERE flushed_at IS NULL")
+
+    def append(self, doc_id, data):
+        """Gravar um voto de forma durável e retornar seu número de sequência"""
+        payload = json.dumps(data, default=_encode, ensure_ascii=False)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO votes (doc_id, payload, created_at) VALUES (?, ?, ?)",
+                (doc_id, payload, time.time())
+            )
+        return cursor.lastrowid
+
+    def mark_flushed(self, seqs):
+        """Marcar votos como enviados ao Firestore"""
+        seqs = list(seqs)
+        if not seqs:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE votes SET flushed_at = ? WHERE seq = ?",
+                [(now, seq) for seq in seqs]
+            )
+
+    def pending(self):
+        """Votos pendentes: o mais recente de cada documento e as sequências que ele cobre
+
+        Retorna uma lista de (doc_id, dados, [seqs]) em ordem de sequência.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, doc_id, payload FROM votes WHERE flushed_at IS NULL ORDER BY seq"
+            ).fetchall()
+        latest = {}
+        for seq, doc_id, payload in rows:
+            seqs = latest.pop(doc_id, (None, []))[1]
+            seqs.append(seq)
+            latest[doc_id] = (payload, seqs)
+        return [
+            (doc_id, json.loads(payload, object_hook=_decode), seqs)
+            for doc_id, (payload, seqs) in latest.items()
+        ]
+
+    def latest_votes(self):
+        """Voto mais recente de cada documento ainda no log (enviados ou não)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM votes WHERE seq IN (SELECT MAX(seq) FROM votes GROUP BY doc_id)"
+            ).fetchall()
+        return [json.loads(payload, object_hook=_decode) for (payload,) in rows]
+
+    def backlog(self):
+        """Quantidade de votos pendentes e horário do mais antigo"""
+        with self._lock:
+            count, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM votes WHERE flushed_at IS NULL"
+            ).fetchone()
+        return count, oldest
+
+    def compact(self, keep_seconds=KEEP_FLUSHED_SECONDS):
+        """Apagar votos já enviados há mais de `keep_seconds`"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM votes WHERE flushed_at IS NOT NULL AND flushed_at < ?",
+                (time.time() - keep_seconds,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def replay(vote_log, commit, batch_size=500):
+    """Enviar os votos pendentes usando `commit(lista de (doc_id, dados))`"""
+    entries = vote_log.pending()
+    for start in range(0, len(entries), batch_size):
+        chunk = entries[start:start + batch_size]
+        commit([(doc_id, data) for doc_id, data, _ in chunk])
+        vote_log.mark_flushed(seq for _, _, seqs in chunk for seq in seqs)
+    return len(entries)
+
+
+def init_firestore_from_env():
+    """Inicializar o Firestore com as credenciais do arquivo .env (uso em scripts)"""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    firebase_creds = {
+        "type": "service_account",
+        "project_id": os.getenv("FIREBASE_PROJECT_ID"),
+        "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
+        "private_key": os.getenv("FIREBASE_PRIVATE_KEY", "").replace("\\n", "\n"),
+        "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
+        "client_id": os.getenv("FIREBASE_CLIENT_ID"),
+        "auth_uri": os.getenv("FIREBASE_AUTH_URI", "https://accounts.google.com/o/oauth2/auth"),
+        "token_uri": os.getenv("FIREBASE_TOKEN_URI", "https://oauth2.googleapis.com/token"),
+        "auth_provider_x509_cert_url": os.getenv("FIREBASE_AUTH_PROVIDER_CERT_URL", "https://www.googleapis.com/oauth2/v1/certs"),
+        "client_x509_cert_url": os.getenv("FIREBASE_CLIENT_CERT_URL")
+    }
+    firebase_admin.initialize_app(credentials.Certificate(firebase_creds))
+    return firestore.client()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    vote_log = VoteLog(os.getenv("VOTE_LOG_PATH", DEFAULT_LOG_PATH))
+
+    count, oldest = vote_log.backlog()
+    print(f"📄 Log de votos: {vote_log.path}")
+    print(f"   Votos pendentes: {count}")
+    if oldest:
+        print(f"   Mais antigo: {datetime.fromtimestamp(oldest).strftime('%d/%m/%Y %H:%M:%S')}")
+
+    if command == "replay":
+        from vote_writer import firestore_commit
+
+        db = init_firestore_from_env()
+        sent = replay(vote_log, firestore_commit(db, os.getenv("FIREBASE_DB_NAME", "evaluations")))
+        print(f"✅ {sent} documentos enviados ao Firestore")
+    elif command != "status":
+        print(f"❌ Comando desconhecido: {command} (use 'status' ou 'replay')")
+        exit(1)
@@ -0,0 +1,191 @@
+"""
+Gravação assíncrona e em lote das avaliações
+
+Os votos entram numa fila do processo e uma thread em segundo plano os grava
+em lotes (Firestore WriteBatch), quando a fila atinge `max_batch` votos ou o
+voto mais antigo espera `max_delay` segundos. Votos repetidos para o mesmo
+documento dentro de um lote são combinados (vale o último), mantendo o
+esquema de IDs `{session_id}_{audio_id}`. Falhas são repetidas com backoff
+exponencial e a fila é esvaziada ao encerrar o processo. Depois de cada lote
+confirmado, `on_written` recebe os tokens dos votos gravados (usado para
+marcar os votos no log local como enviados).
+
+Cada documento gravado leva `updated_at` com o horário do servidor do
+Firestore (hora do commit). É por ele que o painel sincroniza: o `timestamp`
+do voto vem do relógio do cliente e pode ser mais antigo que votos já
+sincronizados (reenvio do log local após uma queda, lote parado no backoff,
+relógio adiantado ou atrasado).
+"""
+
+import time
+import atexit
+import random
+import threading
+from collections import deque
+
+from firebase_admin import firestore
+
+# Limite de escritas por WriteBatch no Firestore
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def firestore_commit(db, collection):
+    """Criar a função de commit que grava um lote de (doc_id, dados) no Firestore"""
+    def commit(writes):
+        batch = db.batch()
+        for doc_id, data in writes:
+            batch.set(db.collection(collection).document(doc_id), {**data, "updated_at": firestore.SERVER_TIMESTAMP})
+        batch.commit()
+    return commit
+
+
+class BatchedVoteWriter:
+    """Fila de votos gravada em lotes por uma thread em segundo plano"""
+
+    def __init__(self, commit, max_batch=50, max_delay=1.0, max_retries=5, backoff=0.5, max_backoff=30.0,
+                 on_written=None):
+        self._commit = commit
+        self._on_written = on_written
+        self.max_batch = min(max_batch, FIRESTORE_BATCH_LIMIT)
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._metrics = {
+            "submitted": 0,
+            "written": 0,
+            "flushes": 0,
+            "retries": 0,
+            "failures": 0,
+            "last_flush_seconds": 0.0,
+            "max_flush_seconds": 0.0,
+            "total_flush_seconds": 0.0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name="vote-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, doc_id, data, tokens=()):
+        """Enfileirar um voto; retorna imediatamente"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchedVoteWriter já foi encerrado")
+            self._queue.append((time.monotonic(), doc_id, data, tuple(tokens)))
+            self._metrics["submitted"] += 1
+            if len(self._queue) >= self.max_batch:
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Esperar até a fila esvaziar; retorna False se o tempo acabar"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=30.0):
+        """Gravar o que estiver na fila e parar a thread"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def metrics(self):
+        """Profundidade da fila e latência das gravações"""
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics["queue_depth"] = len(self._queue)
+        flushes = metrics["flushes"]
+        metrics["avg_flush_seconds"] = metrics["total_flush_seconds"] / flushes if flushes else 0.0
+        return metrics
+
+    def _next_batch(self):
+        """Esperar pelo próximo lote (ou None quando encerrado e vazio)"""
+        with self._cond:
+            while True:
+                if self._queue:
+                    age = time.monotonic() - self._queue[0][0]
+                    if len(self._queue) >= self.max_batch or age >= self.max_delay or self._closed:
+                        break
+                    self._cond.wait(self.max_delay - age)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+
+            items = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            self._busy = True
+            return items
+
+    def _run(self):
+        while True:
+            items = self._next_batch()
+            if items is None:
+                return
+            try:
+                self._write(items)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, items):
+        # Combina votos do mesmo documento: vale o último
+        writes = {}
+        tokens = []
+        for _, doc_id, data, item_tokens in items:
+            writes.pop(doc_id, None)
+            writes[doc_id] = data
+            tokens.extend(item_tokens)
+
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                self._commit(list(writes.items()))
+                break
+            except Exception:
+                attempt += 1
+                with self._cond:
+                    self._metrics["retries"] += 1
+                    closed = self._closed
+                if attempt <= self.max_retries:
+                    delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                    time.sleep(delay * random.uniform(0.5, 1.0))
+                    continue
+
+                with self._cond:
+                    self._metrics["failures"] += 1
+                    if not closed:
+                        # Devolve o lote ao início da fila para tentar de novo mais tarde
+                        self._queue.extendleft(reversed(items))
+                if not closed:
+                    time.sleep(self.max_backoff * random.uniform(0.5, 1.0))
+                return
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._metrics["written"] += len(writes)
+            self._metrics["flushes"] += 1
+            self._metrics["last_flush_seconds"] = elapsed
+            self._metrics["total_flush_seconds"] += elapsed
+            self._metrics["max_flush_seconds"] = max(self._metrics["max_flush_seconds"], elapsed)
+
+        if self._on_written and tokens:
+            try:
+                self._on_written(tokens)
+            except Exception:
+                # Sem a marcação, os votos só serão reenviados (gravação idempotente)
+                pass